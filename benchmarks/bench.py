@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Transfer benchmarks of gofilecli against benchmarks/mock_server.py, no network needed.
+
+    python benchmarks/bench.py
+    python benchmarks/bench.py --workloads small-files,deep-tree --jobs 16 --latency 0.01 --json bench.json
+
+Each workload runs in its own process so the reported peak RSS is its own.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+WORKLOADS = {
+    # File counts and sizes are multiplied by --scale
+    "small-files": {"files": 2000, "size": 4 * 1024},
+    "huge-files": {"files": 2, "size": 256 * 1024 * 1024},
+    "deep-tree": {"depth": 4, "fanout": 4, "files": 2, "size": 16 * 1024},
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def write_files(folder, count, size):
+    os.makedirs(folder, exist_ok=True)
+    block = os.urandom(min(size, 1024 * 1024)) or b""
+    for index in range(count):
+        with open(os.path.join(folder, f"file{index:06d}.bin"), "wb") as f:
+            left = size
+            while left > 0:
+                f.write(block[:left])
+                left -= len(block[:left])
+
+
+def measure(name, function, files, total_bytes, latencies):
+    latencies.clear()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    return {
+        "workload": name,
+        "files": files,
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "files_per_s": round(files / elapsed, 2) if elapsed else 0,
+        "mb_per_s": round(total_bytes / (1024 * 1024) / elapsed, 2) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "requests": len(latencies),
+    }
+
+
+def run_worker(args):
+    import gofilecli
+
+    logger = logging.getLogger("bench")
+    logging.basicConfig(level=logging.ERROR)
+    gofilecli.API_URL = args.api
+    gofilecli.SERVER_URL = args.api + "/{server}"
+    gofilecli.TOKEN = "bench"
+    gofilecli.API = gofilecli.ApiClient(token="bench", rate=args.api_rate, logger=logger)
+    gofilecli.play_sound = lambda logger: None
+    root = gofilecli.get_api().account("bench")["rootFolder"]
+    # Per request latency (time to response headers) of every call on the pooled session
+    latencies = []
+    gofilecli.get_session().hooks["response"].append(lambda response, *a, **k: latencies.append(response.elapsed.total_seconds()))
+    spec = {key: max(1, int(value * args.scale)) if key in ("files", "size") else value for key, value in WORKLOADS[args.worker].items()}
+    results = []
+    work_dir = tempfile.mkdtemp(prefix="gofile-bench-")
+    try:
+        if args.worker == "deep-tree":
+            seeded = gofilecli.get_api().post(f"{args.api}/_mock/seed", json={"parentFolderId": root, **spec})["data"]
+            total_bytes = seeded["files"] * spec["size"]
+            results.append(measure("deep-tree download", lambda: gofilecli.download(seeded["id"], os.path.join(work_dir, "out"), True, logger, jobs=args.jobs, crawl_jobs=args.crawl_jobs, segments=args.segments), seeded["files"], total_bytes, latencies))
+        else:
+            count, size = spec["files"], spec["size"]
+            source = os.path.join(work_dir, "src")
+            write_files(source, count, size)
+            files = gofilecli.get_file_paths(source)
+            folderId = gofilecli.createfolder(root, args.worker, logger)
+            server = gofilecli.getservers(logger)[0]
+            results.append(measure(f"{args.worker} upload", lambda: gofilecli.upload_files(server, folderId, files, args.jobs, logger), count, count * size, latencies))
+            results.append(measure(f"{args.worker} download", lambda: gofilecli.download(folderId, os.path.join(work_dir, "out"), True, logger, jobs=args.jobs, crawl_jobs=args.crawl_jobs, segments=args.segments), count, count * size, latencies))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    rss = peak_rss_mb()
+    for result in results:
+        result["peak_rss_mb"] = round(rss, 1) if rss is not None else None
+    print(json.dumps(results))
+
+
+def start_mock_server(args, storage):
+    command = [sys.executable, os.path.join(BENCH_DIR, "mock_server.py"), "--port", "0", "--storage", storage,
+               "--latency", str(args.latency), "--bandwidth", args.bandwidth, "--rate-limit", str(args.rate_limit)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Listening on "):
+        process.kill()
+        sys.exit(f"Mock server did not start: {line}")
+    return process, line.split()[2]
+
+
+def opt():
+    parser = argparse.ArgumentParser(description="Benchmark gofilecli transfers against a local mock GoFile server.")
+    parser.add_argument("--workloads", type=str, default=",".join(WORKLOADS), help=f"Comma separated workloads [default: {','.join(WORKLOADS)}]")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier of the file counts and sizes of the workloads [default: 1.0]")
+    parser.add_argument("--jobs", "-j", type=int, default=8, help="Parallel transfers [default: 8]")
+    parser.add_argument("--crawl-jobs", type=int, default=8, help="Parallel folder listings [default: 8]")
+    parser.add_argument("--segments", type=int, default=4, help="Ranged connections per downloaded file [default: 4]")
+    parser.add_argument("--api-rate", type=float, default=1000, help="Initial API request rate of the client [default: 1000]")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added by the mock server to every request [default: 0]")
+    parser.add_argument("--bandwidth", type=str, default="0", help="Mock server per connection bandwidth cap, e.g. 50M [default: none]")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Mock server API requests per second before error-rateLimit [default: none]")
+    parser.add_argument("--json", type=str, help="Also write the results to this JSON file")
+    parser.add_argument("--worker", type=str, choices=list(WORKLOADS), help=argparse.SUPPRESS)
+    parser.add_argument("--api", type=str, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = opt()
+    if args.worker:
+        return run_worker(args)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="gofile-mock-") as storage, tempfile.TemporaryDirectory(prefix="gofile-cache-") as cache:
+        server, api = start_mock_server(args, storage)
+        # Workers start from an empty cache (servers, hashes, metadata) that is not the user's
+        env = {**os.environ, "XDG_CACHE_HOME": cache, "LOCALAPPDATA": cache}
+        try:
+            for workload in filter(None, args.workloads.split(",")):
+                if workload not in WORKLOADS:
+                    sys.exit(f"Unknown workload: {workload}")
+                command = [sys.executable, os.path.abspath(__file__), "--worker", workload, "--api", api,
+                           "--scale", str(args.scale), "--jobs", str(args.jobs), "--crawl-jobs", str(args.crawl_jobs),
+                           "--segments", str(args.segments), "--api-rate", str(args.api_rate)]
+                process = subprocess.run(command, capture_output=True, text=True, env=env)
+                if process.returncode != 0:
+                    sys.stderr.write(process.stderr)
+                    sys.exit(f"Workload {workload} failed")
+                results += json.loads(process.stdout.strip().splitlines()[-1])
+        finally:
+            server.terminate()
+            server.wait()
+
+    columns = ["workload", "files", "seconds", "files_per_s", "mb_per_s", "p50_ms", "p99_ms", "requests", "peak_rss_mb"]
+    widths = [max(len(column), *(len(str(result[column])) for result in results)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print("  ".join(str(result[column]).ljust(width) for column, width in zip(columns, widths)))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the GoFile API and storage servers, used to measure the CLI
+without network access.
+
+    python benchmarks/mock_server.py --port 8080 --latency 0.02 --bandwidth 50M --rate-limit 20
+
+Point the CLI at it with:
+
+    GOFILE_API_URL=http://127.0.0.1:8080 GOFILE_SERVER_URL=http://127.0.0.1:8080/{server} gofilecli ...
+"""
+import argparse
+import hashlib
+import http.server
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import unquote, urlsplit
+
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_rate(value):
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = str(value).strip().upper().rstrip("B")
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(float(value or 0))
+
+
+class MockGoFile:
+    """
+    In-memory content tree with the file data kept in `storage`.
+    """
+
+    def __init__(self, storage, servers=("store1", "store2"), account_id="mock-account"):
+        self.storage = storage
+        self.servers = list(servers)
+        self.account_id = account_id
+        self.contents = {}
+        self.codes = {}
+        # Folders whose listing fails, to test how clients handle it
+        self.unlisted = set()
+        self.lock = threading.Lock()
+        self.root = self.add_folder(None, "root")["id"]
+
+    def add_folder(self, parentId, name):
+        with self.lock:
+            folder = {"id": str(uuid.uuid4()), "type": "folder", "name": name, "code": uuid.uuid4().hex[:6],
+                      "parentFolder": parentId, "public": False, "createTime": int(time.time()), "children": []}
+            self.contents[folder["id"]] = folder
+            self.codes[folder["code"]] = folder["id"]
+            if parentId:
+                self.contents[parentId]["children"].append(folder["id"])
+            return folder
+
+    def add_file(self, parentId, name, path, md5, server):
+        with self.lock:
+            fileId = os.path.basename(path)
+            entry = {"id": fileId, "type": "file", "name": name, "parentFolder": parentId, "size": os.path.getsize(path),
+                     "md5": md5, "serverSelected": server, "createTime": int(time.time())}
+            self.contents[fileId] = entry
+            self.contents[parentId]["children"].append(fileId)
+            return entry
+
+    def copy(self, contentId, folderId):
+        content = self.get(contentId)
+        if content is None or content["type"] != "file":
+            return None
+        path = os.path.join(self.storage, str(uuid.uuid4()))
+        shutil.copyfile(os.path.join(self.storage, content["id"]), path)
+        return self.add_file(folderId, content["name"], path, content["md5"], content["serverSelected"])
+
+    def move(self, contentId, folderId):
+        with self.lock:
+            content = self.contents.get(contentId)
+            if content is None:
+                return False
+            parent = self.contents.get(content["parentFolder"])
+            if parent and contentId in parent["children"]:
+                parent["children"].remove(contentId)
+            content["parentFolder"] = folderId
+            self.contents[folderId]["children"].append(contentId)
+            return True
+
+    def get(self, contentId):
+        return self.contents.get(self.codes.get(contentId, contentId))
+
+    def view(self, contentId, base_url):
+        with self.lock:
+            content = self.get(contentId)
+            if content is None or content["id"] in self.unlisted:
+                return None
+            data = {key: value for key, value in content.items() if key != "children"}
+            if content["type"] == "folder":
+                data["childrenCount"] = len(content["children"])
+                data["children"] = {}
+                for childId in content["children"]:
+                    child = {key: value for key, value in self.contents[childId].items() if key != "children"}
+                    if child["type"] == "file":
+                        child["link"] = f"{base_url}/download/{childId}/{child['name']}"
+                    else:
+                        child["childrenCount"] = len(self.contents[childId]["children"])
+                    data["children"][childId] = child
+            return data
+
+    def delete(self, contentId):
+        with self.lock:
+            self._delete(contentId)
+
+    def _delete(self, contentId):
+        content = self.contents.pop(contentId, None)
+        if content is None:
+            return
+        parent = self.contents.get(content["parentFolder"])
+        if parent and contentId in parent["children"]:
+            parent["children"].remove(contentId)
+        if content["type"] == "folder":
+            self.codes.pop(content["code"], None)
+            for childId in list(content["children"]):
+                self._delete(childId)
+        else:
+            os.remove(os.path.join(self.storage, contentId))
+
+    def seed(self, parentId, depth, fanout, files, size):
+        # Builds a tree of `depth` levels of `fanout` subfolders holding `files` files each
+        folders, count = 0, 0
+        level = [self.add_folder(parentId, "seed")["id"]]
+        rootId = level[0]
+        for current_depth in range(depth + 1):
+            next_level = []
+            for folderId in level:
+                folders += 1
+                for index in range(files):
+                    path = os.path.join(self.storage, str(uuid.uuid4()))
+                    data = os.urandom(size)
+                    with open(path, "wb") as f:
+                        f.write(data)
+                    self.add_file(folderId, f"file{index}.bin", path, hashlib.md5(data).hexdigest(), self.servers[0])
+                    count += 1
+                if current_depth < depth:
+                    next_level += [self.add_folder(folderId, f"dir{index}")["id"] for index in range(fanout)]
+            level = next_level
+        return {"id": rootId, "folders": folders, "files": count}
+
+
+class RateLimiter:
+    # Sliding one second window over the API requests
+    def __init__(self, limit):
+        self.limit = limit
+        self.history = []
+        self.lock = threading.Lock()
+
+    def allow(self):
+        if not self.limit:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.history = [t for t in self.history if now - t < 1]
+            if len(self.history) >= self.limit:
+                return False
+            self.history.append(now)
+            return True
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockGoFile/1.0"
+
+    @property
+    def gofile(self):
+        return self.server.gofile
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            super().log_message(*args)
+
+    def base_url(self):
+        return f"http://{self.headers.get('Host') or '%s:%s' % self.server.server_address[:2]}"
+
+    def reply(self, data, status="ok", code=200):
+        body = json.dumps({"status": status, "data": data if data is not None else {}}).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+
+    def throttled_write(self, data):
+        bandwidth = self.server.bandwidth
+        start = time.monotonic()
+        self.wfile.write(data)
+        if bandwidth:
+            delay = len(data) / bandwidth - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+    def throttled_read(self, size):
+        bandwidth = self.server.bandwidth
+        start = time.monotonic()
+        data = self.rfile.read(size)
+        if bandwidth:
+            delay = len(data) / bandwidth - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def route(self, method):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        path = unquote(urlsplit(self.path).path).rstrip("/")
+        self.server.count(method, path)
+        parts = path.strip("/").split("/")
+        if parts[0] in self.gofile.servers:
+            return self.storage_route(method, parts[1:])
+        if parts[0] == "download" and method in ("GET", "HEAD"):
+            return self.send_content(parts[1] if len(parts) > 1 else "", method)
+        if parts[0] == "_mock":
+            return self.admin_route(method, parts[1:])
+        if not self.server.rate_limiter.allow():
+            return self.reply(None, status="error-rateLimit", code=429)
+        return self.api_route(method, parts)
+
+    def api_route(self, method, parts):
+        gofile = self.gofile
+        if method == "GET" and parts == ["servers"]:
+            return self.reply({"servers": [{"name": name, "zone": "eu"} for name in gofile.servers]})
+        if method == "GET" and len(parts) == 2 and parts[0] == "accounts":
+            with gofile.lock:
+                files = [c for c in gofile.contents.values() if c["type"] == "file"]
+                stats = {"fileCount": len(files), "folderCount": len(gofile.contents) - len(files),
+                         "storage": sum(c["size"] for c in files), "trafficWebDownloaded": self.server.downloaded}
+            return self.reply({"id": gofile.account_id, "rootFolder": gofile.root, "statsCurrent": stats})
+        if method == "POST" and parts == ["contents", "createFolder"]:
+            body = self.read_json()
+            if not gofile.get(body.get("parentFolderId", "")):
+                return self.reply(None, status="error-notFound", code=404)
+            folder = gofile.add_folder(gofile.get(body["parentFolderId"])["id"], body.get("folderName") or uuid.uuid4().hex[:8])
+            return self.reply({key: value for key, value in folder.items() if key != "children"})
+        if method == "PUT" and len(parts) == 3 and parts[0] == "contents" and parts[2] == "update":
+            body = self.read_json()
+            content = gofile.get(parts[1])
+            if content is None:
+                return self.reply(None, status="error-notFound", code=404)
+            attribute = body.get("attribute")
+            with gofile.lock:
+                content[attribute] = body.get("attributeValue")
+            return self.reply({})
+        if method == "DELETE" and parts == ["contents"]:
+            body = self.read_json()
+            result = {}
+            for contentId in filter(None, body.get("contentsId", "").split(",")):
+                found = gofile.get(contentId) is not None
+                gofile.delete(contentId)
+                result[contentId] = {"status": "ok" if found else "error-notFound"}
+            return self.reply(result)
+        if method == "POST" and parts == ["contents", "copy"]:
+            body = self.read_json()
+            folder = gofile.get(body.get("folderId", ""))
+            if folder is None or folder["type"] != "folder":
+                return self.reply(None, status="error-notFound", code=404)
+            result = {}
+            for contentId in filter(None, body.get("contentsId", "").split(",")):
+                copied = gofile.copy(contentId, folder["id"])
+                if copied is None:
+                    return self.reply(None, status="error-notFound", code=404)
+                result[contentId] = {"status": "ok", "id": copied["id"]}
+            return self.reply(result)
+        if method == "PUT" and parts == ["contents", "move"]:
+            body = self.read_json()
+            folder = gofile.get(body.get("folderId", ""))
+            if folder is None or folder["type"] != "folder":
+                return self.reply(None, status="error-notFound", code=404)
+            result = {}
+            for contentId in filter(None, body.get("contentsId", "").split(",")):
+                result[contentId] = {"status": "ok" if gofile.move(contentId, folder["id"]) else "error-notFound"}
+            return self.reply(result)
+        if method == "GET" and len(parts) == 2 and parts[0] == "contents":
+            data = gofile.view(parts[1], self.base_url())
+            if data is None:
+                return self.reply(None, status="error-notFound", code=404)
+            return self.reply(data)
+        return self.reply(None, status="error-notFound", code=404)
+
+    def storage_route(self, method, parts):
+        if method in ("GET", "HEAD") and not parts:
+            # Probe target: a fixed payload for latency and throughput probes
+            payload = b"\0" * 256 * 1024
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if method == "GET":
+                for start in range(0, len(payload), CHUNK_SIZE):
+                    self.throttled_write(payload[start:start + CHUNK_SIZE])
+            return
+        if method == "POST" and parts == ["contents", "uploadfile"]:
+            return self.upload()
+        return self.reply(None, status="error-notFound", code=404)
+
+    def admin_route(self, method, parts):
+        if method == "POST" and parts == ["seed"]:
+            body = self.read_json()
+            data = self.gofile.seed(body.get("parentFolderId") or self.gofile.root, int(body.get("depth", 2)),
+                                    int(body.get("fanout", 2)), int(body.get("files", 1)), int(body.get("size", 1024)))
+            return self.reply(data)
+        if method == "POST" and parts == ["unlist"]:
+            body = self.read_json()
+            with self.gofile.lock:
+                if body.get("unlisted", True):
+                    self.gofile.unlisted.add(body["contentId"])
+                else:
+                    self.gofile.unlisted.discard(body["contentId"])
+            return self.reply({})
+        if method == "GET" and parts == ["stats"]:
+            return self.reply({"requests": dict(self.server.requests), "uploaded": self.server.uploaded, "downloaded": self.server.downloaded})
+        return self.reply(None, status="error-notFound", code=404)
+
+    def upload(self):
+        gofile = self.gofile
+        match = re.search(r'boundary="?([^";]+)"?', self.headers.get("Content-Type", ""))
+        if not match or "Content-Length" not in self.headers:
+            return self.reply(None, status="error-badRequest", code=400)
+        fields = {}
+        fileId = str(uuid.uuid4())
+        path = os.path.join(gofile.storage, fileId)
+        filename, md5 = None, hashlib.md5()
+        try:
+            with open(path, "wb") as f:
+                for name, part_filename, chunk in self.multipart(match.group(1).encode(), int(self.headers["Content-Length"])):
+                    if part_filename is not None:
+                        filename = part_filename
+                        f.write(chunk)
+                        md5.update(chunk)
+                    else:
+                        fields[name] = fields.get(name, b"") + chunk
+        except ValueError:
+            os.remove(path)
+            return self.reply(None, status="error-badRequest", code=400)
+        if filename is None:
+            os.remove(path)
+            return self.reply(None, status="error-noFile", code=400)
+        folderId = fields.get("folderId", b"").decode()
+        folder = gofile.get(folderId) if folderId else gofile.add_folder(gofile.root, uuid.uuid4().hex[:8])
+        if folder is None:
+            os.remove(path)
+            return self.reply(None, status="error-notFound", code=404)
+        server = self.path.strip("/").split("/")[0]
+        entry = gofile.add_file(folder["id"], filename, path, md5.hexdigest(), server)
+        self.server.uploaded += entry["size"]
+        return self.reply({"id": entry["id"], "name": filename, "size": entry["size"], "md5": entry["md5"],
+                           "parentFolder": folder["id"], "parentFolderCode": folder["code"], "servers": [server],
+                           "downloadPage": f"{self.base_url()}/d/{folder['code']}"})
+
+    def multipart(self, boundary, length):
+        # Streaming multipart/form-data parser yielding (name, filename, chunk)
+        # so uploads are written to disk without being held in memory.
+        remaining = length
+        buffer = b""
+
+        def fill():
+            nonlocal remaining, buffer
+            if remaining <= 0:
+                raise ValueError("Truncated multipart body")
+            data = self.throttled_read(min(CHUNK_SIZE, remaining))
+            if not data:
+                raise ValueError("Truncated multipart body")
+            remaining -= len(data)
+            buffer += data
+
+        delimiter = b"--" + boundary
+        separator = b"\r\n" + delimiter
+        while delimiter + b"\r\n" not in buffer:
+            fill()
+        buffer = buffer[buffer.index(delimiter + b"\r\n") + len(delimiter) + 2:]
+        while True:
+            while b"\r\n\r\n" not in buffer:
+                fill()
+            raw_headers, buffer = buffer.split(b"\r\n\r\n", 1)
+            disposition = raw_headers.decode(errors="replace")
+            name = re.search(r'name="([^"]*)"', disposition)
+            filename = re.search(r'filename="([^"]*)"', disposition)
+            name = name.group(1) if name else ""
+            filename = unquote(filename.group(1)) if filename else None
+            while True:
+                index = buffer.find(separator)
+                if index >= 0:
+                    if index:
+                        yield name, filename, buffer[:index]
+                    buffer = buffer[index + len(separator):]
+                    break
+                if len(buffer) > len(separator):
+                    yield name, filename, buffer[:-len(separator)]
+                    buffer = buffer[-len(separator):]
+                fill()
+            while len(buffer) < 2:
+                fill()
+            if buffer.startswith(b"--"):
+                while remaining > 0:
+                    remaining -= len(self.rfile.read(min(CHUNK_SIZE, remaining)))
+                return
+            buffer = buffer[2:]
+
+    def send_content(self, fileId, method):
+        content = self.gofile.get(fileId)
+        if content is None or content["type"] != "file":
+            return self.reply(None, status="error-notFound", code=404)
+        size = content["size"]
+        start, end = 0, size - 1
+        match = re.match(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(0, size - int(match.group(2)))
+            if start >= size or start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if method == "HEAD":
+            return
+        with open(os.path.join(self.gofile.storage, content["id"]), "rb") as f:
+            f.seek(start)
+            left = end - start + 1
+            while left > 0:
+                data = f.read(min(CHUNK_SIZE, left))
+                if not data:
+                    break
+                self.throttled_write(data)
+                left -= len(data)
+                self.server.downloaded += len(data)
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_HEAD(self):
+        self.route("HEAD")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def do_PUT(self):
+        self.route("PUT")
+
+    def do_DELETE(self):
+        self.route("DELETE")
+
+
+class MockServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, gofile, latency=0, bandwidth=0, rate_limit=0, verbose=False):
+        super().__init__(address, Handler)
+        self.gofile = gofile
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.verbose = verbose
+        self.requests = {}
+        self.uploaded = 0
+        self.downloaded = 0
+        self.counter_lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections are expected, not errors
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def count(self, method, path):
+        key = f"{method} {re.sub(r'/[0-9a-f-]{6,}', '/{id}', path) or '/'}"
+        with self.counter_lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+
+def opt():
+    parser = argparse.ArgumentParser(description="Local mock of the GoFile API and storage servers.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on [default: 127.0.0.1]")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on, 0 picks a free one [default: 8080]")
+    parser.add_argument("--storage", type=str, help="Folder keeping the uploaded files [default: a temporary folder]")
+    parser.add_argument("--servers", type=str, default="store1,store2", help="Comma separated storage server names [default: store1,store2]")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds added to every request [default: 0]")
+    parser.add_argument("--bandwidth", type=str, default="0", help="Per connection bandwidth cap, e.g. 20M, 0 for none [default: 0]")
+    parser.add_argument("--rate-limit", type=int, default=0, help="API requests per second before error-rateLimit, 0 for none [default: 0]")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Log every request")
+    return parser.parse_args()
+
+
+def main():
+    args = opt()
+    storage = args.storage or tempfile.mkdtemp(prefix="gofile-mock-")
+    os.makedirs(storage, exist_ok=True)
+    gofile = MockGoFile(storage, servers=args.servers.split(","))
+    server = MockServer((args.host, args.port), gofile, latency=args.latency, bandwidth=parse_rate(args.bandwidth),
+                        rate_limit=args.rate_limit, verbose=args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Listening on http://{host}:{port} (account {gofile.account_id}, root folder {gofile.root})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if not args.storage:
+            shutil.rmtree(storage, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
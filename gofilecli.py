@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import requests
 import random
 import time
 import argparse
@@ -8,50 +7,437 @@ import logging
 import sys
 import platform
 import subprocess
-import sys
-import simpleaudio as sa
-from tqdm import tqdm
+import signal
 import json
-from dotenv import load_dotenv
+import threading
+import uuid
+import hashlib
+import posixpath
+import fnmatch
+import re
+import tarfile
+import tempfile
+import sqlite3
+import math
+import functools
+import heapq
+import collections
+import itertools
+import getpass
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first use, keeping it off
+    the startup path of commands that never touch it (e.g. --help, --queue).
+    Wraps a function with a plain import statement so Nuitka still bundles it.
+    """
+
+    def __init__(self, load):
+        self._load = load
+
+    def __getattr__(self, attribute):
+        module = self._load()
+        # Later lookups of the module global skip the proxy
+        globals()[self._load.__name__] = module
+        return getattr(module, attribute)
+
+
+@LazyModule
+def requests():
+    import requests
+    return requests
+
+
+@LazyModule
+def asyncio():
+    import asyncio
+    return asyncio
+
+
+def tqdm(*args, **kwargs):
+    from tqdm import tqdm
+    return tqdm(*args, **kwargs)
+
+
+def logging_redirect_tqdm():
+    from tqdm.contrib.logging import logging_redirect_tqdm
+    return logging_redirect_tqdm()
+
 
 # Suppress ALSA warnings
 os.environ['SDL_AUDIODRIVER'] = 'dummy'
 os.environ['AUDIODEV'] = 'null'
 
+CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_BUFFER = 1024 * 1024
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+STATE_SAVE_INTERVAL = 16 * 1024 * 1024
+PROBE_BYTES = 256 * 1024
+PROBE_TIMEOUT = 5
+SERVER_CACHE_TTL = 3600
+SCHEDULER_EWMA = 0.3
+SCHEDULER_MIN_SAMPLE = 1024 * 1024
+SCHEDULER_COOLDOWN = 30
+SCHEDULER_MAX_COOLDOWN = 600
+DAEMON_POLL_INTERVAL = 1.0
+DAEMON_MAX_ATTEMPTS = 5
+DAEMON_RETRY_DELAY = 30
+# Transfers a daemon keeps for its --report, the totals still count all of them
+DAEMON_METRICS_RECORDS = 1000
+STARTUP_BUDGET = 0.25
+STARTUP_RUNS = 5
+IGNORE_FILE = ".gofileignore"
+SCAN_LOOKAHEAD = 256
+BULK_ACTIONS = ("publish", "unpublish", "delete", "move", "rename", "set")
+# The options --stats can be combined with
+STATS_OPTIONS = ("--stats", "-s", "--cache-ttl", "--log-level", "--token", "-tk", "--timeout", "--retries", "--api-rate", "--no-sound")
+BULK_BATCH = 100
+METADATA_CACHE_TTL = 300
+METADATA_CACHE_MAX_AGE = 7 * 24 * 3600
+METADATA_CACHE_ENTRIES = 100000
+HASH_INDEX_ENTRIES = 100000
+BUNDLE_THRESHOLD = 1024 * 1024
+BUNDLE_SIZE = 256 * 1024 * 1024
+BUNDLE_PREFIX = "gofilecli-bundle-"
+BUNDLE_PATTERN = re.compile(rf"^{BUNDLE_PREFIX}[0-9a-f]+-\d+\.tar(\.enc)?$")
+# Encrypted files: magic, 16 bytes of salt for the file key and a 7 bytes nonce
+# prefix, then CHUNK_SIZE chunks each followed by its 16 bytes AES-GCM tag
+ENCRYPTED_SUFFIX = ".enc"
+ENCRYPTION_MAGIC = b"GOFCENC2"
+# Magic, scrypt salt, file salt and nonce prefix
+ENCRYPTION_HEADER = len(ENCRYPTION_MAGIC) + 16 + 16 + 7
+ENCRYPTION_TAG = 16
+ENCRYPTED_CHUNK = CHUNK_SIZE + ENCRYPTION_TAG
+DEFAULT_API_URL = "https://api.gofile.io"
+DEFAULT_SERVER_URL = "https://{server}.gofile.io"
+# Overridable to point the CLI at another endpoint, e.g. benchmarks/mock_server.py
+API_URL = os.getenv("GOFILE_API_URL", DEFAULT_API_URL)
+SERVER_URL = os.getenv("GOFILE_SERVER_URL", DEFAULT_SERVER_URL)
+SESSION = None
+CRYPTO_EXECUTOR = None
+API = None
+CACHE = None
+CACHE_TTL = METADATA_CACHE_TTL
+SERVERS = None
+LIMITER = None
+TRANSFER_RATE = 0
+METRICS = None
+TOKEN = None
+SOUND = True
+SESSION_LOCK = threading.Lock()
+# Set on Ctrl-C, running transfers give up at their next chunk
+STOP = threading.Event()
+
+
+class GoFileError(Exception):
+    pass
+
+
+class GoFileConnectionError(GoFileError):
+    pass
+
+
+class GoFileChecksumError(GoFileError):
+    pass
+
+
+class GoFileInterrupted(GoFileError):
+    pass
+
+
+class GoFileAPIError(GoFileError):
+    def __init__(self, status, response=None):
+        super().__init__(f"GoFile API error: {status}")
+        self.status = status
+        self.response = response
+
+
+class GoFileRateLimitError(GoFileAPIError):
+    pass
+
+
+class RateGovernor:
+    """
+    Token bucket shared by every API call. Its rate adapts AIMD style: it creeps
+    up while calls succeed, and a rate limit answer halves it and pauses all
+    callers for a cooldown that doubles while the limits keep coming.
+    """
 
-def reqst(url, method ,headers=None, data=None, files=None, params=None, json=None, logger=None):
-    try:
-        if method == "get":
-            response = requests.get(url, headers=headers, data=data, params=params, json=json)
-        elif method == "post":
-            response = requests.post(url, headers=headers, data=data, files=files, params=params, json=json)
-        elif method == "put":
-            response = requests.put(url, headers=headers, data=data, files=files, params=params, json=json)
-        elif method == "delete":
-            response = requests.delete(url, headers=headers, data=data, files=files, params=params, json=json)
-        logger.debug(f"Request to {url} with method {method} returned status code {response.status_code}")
-        json_response = response.json()  # If response content is not JSON, this will raise a ValueError
-        return json_response
-    except requests.exceptions.HTTPError as http_err:
-        logger.debug(f"Response: {response.text}")
-        logger.error(f"HTTP error occurred: {http_err}")  # Handles HTTP errors (e.g., 404, 500)
-        sys.exit()
-    except requests.exceptions.ConnectionError as conn_err:
-        logger.debug(f"Response: {response.text}")
-        logger.error(f"Connection error occurred: {conn_err}")  # Handles network-related errors
-        sys.exit()
-    except requests.exceptions.Timeout as timeout_err:
-        logger.debug(f"Response: {response.text}")
-        logger.error(f"Timeout error occurred: {timeout_err}")  # Handles request timeouts
-        sys.exit()
-    except requests.exceptions.RequestException as req_err:
-        logger.debug(f"Response: {response.text}")
-        logger.error(f"An error occurred: {req_err}")  # Catches any other requests-related errors
-        sys.exit()
-    except ValueError as json_err:
-        logger.debug(f"Response: {response.text}")
-        logger.error(f"JSON decode error: {json_err}")  # Handles issues with JSON decoding
-        sys.exit()
+    def __init__(self, rate=5.0, min_rate=0.2, max_rate=50.0, increase=1.0, max_cooldown=60, logger=None):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.max_cooldown = max_cooldown
+        self.cooldown = 1.0
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.throttled_until = 0
+        self.throttle_events = 0
+        self.lock = threading.Lock()
+        self.logger = logger or logging.getLogger(__name__)
+
+    def acquire(self):
+        # Tokens may go negative: each caller reserves its slot and sleeps until
+        # it. A rate limit during the sleep invalidates the slot, which is then
+        # reserved again at the lowered rate.
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                self.tokens -= 1
+                wait_time = -self.tokens / self.rate if self.tokens < 0 else 0
+                generation = self.throttle_events
+            if wait_time <= 0:
+                return
+            time.sleep(wait_time)
+            with self.lock:
+                if generation == self.throttle_events:
+                    return
+
+    def on_success(self):
+        with self.lock:
+            previous = self.rate
+            # About `increase` req/s more per second of successful calls
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            if time.monotonic() >= self.throttled_until:
+                self.cooldown = 1.0
+        if int(self.rate) != int(previous):
+            self.logger.debug(f"API rate raised to {self.rate:.2f} req/s")
+
+    def on_rate_limit(self, retry_after=None):
+        with self.lock:
+            self.throttle_events += 1
+            now = time.monotonic()
+            if now < self.throttled_until:
+                # The requests that were in flight during the same throttle window
+                # only reschedule themselves, the rate is halved once per window.
+                return
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after is not None else self.cooldown
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self.throttled_until = now + pause
+            # Pending reservations are invalidated, so the debt restarts from the pause
+            self.tokens = -pause * self.rate
+            self.updated = now
+        self.logger.debug(f"Rate limited ({self.throttle_events} throttle events), API rate lowered to {self.rate:.2f} req/s, pausing {pause:.1f}s")
+
+
+class ApiClient:
+    """
+    Client for api.gofile.io sharing the pooled session and a RateGovernor, with
+    timeouts and exponential backoff (with jitter) on 5xx and connection errors.
+    """
+
+    def __init__(self, token=None, timeout=30, retries=5, backoff=1.0, max_backoff=60, rate=5.0, rate_limit_retries=10, governor=None, logger=None, api_url=None):
+        self.token = token
+        self.api_url = api_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limit_retries = rate_limit_retries
+        self.logger = logger or logging.getLogger(__name__)
+        self.governor = governor or RateGovernor(rate=rate, logger=self.logger)
+
+    def delay(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def request(self, method, path, params=None, json=None):
+        url = path if path.startswith("http") else f"{self.api_url or API_URL}/{path.lstrip('/')}"
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+        failures = 0
+        rate_limits = 0
+        while True:
+            self.governor.acquire()
+            try:
+                response = get_session().request(method, url, headers=headers, params=params, json=json, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if failures == self.retries:
+                    raise GoFileConnectionError(f"{method.upper()} {url} failed: {e}") from e
+                wait_time = self.delay(failures)
+                failures += 1
+                self.logger.warning(f"{method.upper()} {url} failed ({e}), retrying in {wait_time:.1f}s")
+                time.sleep(wait_time)
+                continue
+            self.logger.debug(f"Request to {url} with method {method} returned status code {response.status_code}")
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+            status = data.get("status") if isinstance(data, dict) else None
+            if status == "error-rateLimit" or response.status_code == 429:
+                if rate_limits == self.rate_limit_retries:
+                    raise GoFileRateLimitError(status or "error-rateLimit", data)
+                rate_limits += 1
+                retry_after = response.headers.get("Retry-After", "")
+                self.governor.on_rate_limit(int(retry_after) if retry_after.isdigit() else None)
+                continue
+            if response.status_code >= 500:
+                if failures == self.retries:
+                    raise GoFileConnectionError(f"{method.upper()} {url} returned {response.status_code}")
+                wait_time = self.delay(failures)
+                failures += 1
+                self.logger.warning(f"{method.upper()} {url} returned {status or response.status_code}, retrying in {wait_time:.1f}s")
+                time.sleep(wait_time)
+                continue
+            self.governor.on_success()
+            if data is None:
+                self.logger.debug(f"Response: {response.text}")
+                raise GoFileError(f"{method.upper()} {url} returned a non JSON response ({response.status_code})")
+            if status != "ok":
+                raise GoFileAPIError(status, data)
+            return data
+
+    def get(self, path, params=None):
+        return self.request("get", path, params=params)
+
+    def post(self, path, json=None):
+        return self.request("post", path, json=json)
+
+    def put(self, path, json=None):
+        return self.request("put", path, json=json)
+
+    def delete(self, path, json=None):
+        return self.request("delete", path, json=json)
+
+    def servers(self):
+        return [server["name"] for server in self.get("servers")["data"]["servers"]]
+
+    def account(self, accountId):
+        return self.get(f"accounts/{accountId}")["data"]
+
+    def contents(self, contentId):
+        params = (('wt', '4fd6sg89d7s6'),('cache', 'false'),)
+        return self.get(f"contents/{contentId}", params=params)["data"]
+
+    def create_folder(self, parentFolderId, folderName=None):
+        data = {"parentFolderId": parentFolderId}
+        if folderName:
+            data["folderName"] = folderName
+        return self.post("contents/createFolder", json=data)["data"]
+
+    def update(self, contentId, attribute, attributeValue):
+        data = {"attribute": attribute, "attributeValue": attributeValue}
+        return self.put(f"contents/{contentId}/update", json=data)["data"]
+
+    def delete_contents(self, contentsIds):
+        return self.delete("contents", json={"contentsId": ",".join(contentsIds)})["data"]
+
+    def copy_contents(self, contentsIds, folderId):
+        return self.post("contents/copy", json={"contentsId": ",".join(contentsIds), "folderId": folderId})["data"]
+
+    def move_contents(self, contentsIds, folderId):
+        return self.put("contents/move", json={"contentsId": ",".join(contentsIds), "folderId": folderId})["data"]
+
+
+class MetadataCache:
+    """
+    SQLite index of what the API answered for folders (children, code, sizes,
+    md5s) and accounts, with the time it was fetched. An entry is served while
+    it is younger than the max_age asked by the caller, entries older than
+    METADATA_CACHE_MAX_AGE are dropped and the least recently used ones are
+    evicted beyond max_entries.
+    """
+
+    def __init__(self, path=None, ttl=METADATA_CACHE_TTL, max_entries=METADATA_CACHE_ENTRIES, logger=None):
+        self.path = path or os.path.join(get_cache_dir(), "metadata.sqlite")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.logger = logger or logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS entries (kind TEXT, key TEXT, data TEXT, fetched REAL, accessed REAL, PRIMARY KEY (kind, key))")
+            self.db.execute("CREATE TABLE IF NOT EXISTS codes (code TEXT PRIMARY KEY, id TEXT)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self.evict()
+
+    def evict(self):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM entries WHERE fetched < ?", (time.time() - METADATA_CACHE_MAX_AGE,))
+            count = self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            if count > self.max_entries:
+                self.db.execute("DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY accessed LIMIT ?)", (count - self.max_entries,))
+            self.db.execute("DELETE FROM codes WHERE id NOT IN (SELECT key FROM entries WHERE kind = 'contents')")
+
+    def lookup(self, kind, key, max_age):
+        now = time.time()
+        with self.lock, self.db:
+            if kind == "contents":
+                row = self.db.execute("SELECT id FROM codes WHERE code = ?", (key,)).fetchone()
+                key = row[0] if row else key
+            row = self.db.execute("SELECT data, fetched FROM entries WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+            if row is None or now - row[1] > max_age:
+                return None
+            self.db.execute("UPDATE entries SET accessed = ? WHERE kind = ? AND key = ?", (now, kind, key))
+        return json.loads(row[0])
+
+    def store(self, kind, key, data):
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", (kind, key, json.dumps(data), now, now))
+            if kind == "contents" and data.get("code"):
+                self.db.execute("INSERT OR REPLACE INTO codes VALUES (?, ?)", (data["code"], key))
+
+    def cached(self, kind, key, fetch, max_age=None):
+        max_age = self.ttl if max_age is None else max_age
+        data = self.lookup(kind, key, max_age) if max_age > 0 else None
+        if data is not None:
+            self.logger.debug(f"Metadata cache hit for {kind} {key}")
+            return data
+        data = fetch()
+        self.store(kind, data.get("id", key) if kind == "contents" else key, data)
+        return data
+
+    def contents(self, contentId, max_age=None, api=None):
+        return self.cached("contents", contentId, lambda: (api or get_api()).contents(contentId), max_age)
+
+    def account(self, accountId, max_age=None, api=None):
+        return self.cached("account", accountId, lambda: (api or get_api()).account(accountId), max_age)
+
+    def root_folder(self, accountId, api=None):
+        # Kept apart from the account stats: the root folder never changes
+        data = self.cached("rootFolder", accountId, lambda: {"rootFolder": (api or get_api()).account(accountId).get("rootFolder")}, math.inf)
+        return data.get("rootFolder")
+
+    def invalidate(self, *contentIds):
+        # Drops the entries of the contents and of their parent folders, whose
+        # listings embed them, and the account stats that count them
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM entries WHERE kind = 'account'")
+            for contentId in contentIds:
+                row = self.db.execute("SELECT id FROM codes WHERE code = ?", (contentId,)).fetchone()
+                contentId = row[0] if row else contentId
+                row = self.db.execute("SELECT data FROM entries WHERE kind = 'contents' AND key = ?", (contentId,)).fetchone()
+                parentId = json.loads(row[0]).get("parentFolder") if row else None
+                self.db.execute("DELETE FROM entries WHERE kind = 'contents' AND key IN (?, ?)", (contentId, parentId or contentId))
+
+    def close(self):
+        self.db.close()
+
+
+def get_cache():
+    global CACHE
+    with SESSION_LOCK:
+        if CACHE is None:
+            CACHE = MetadataCache(ttl=CACHE_TTL)
+        return CACHE
+
+
+def get_api():
+    global API
+    with SESSION_LOCK:
+        if API is None:
+            API = ApiClient(token=TOKEN)
+        return API
 
 
 def load_file(file_name: str) -> str:
@@ -62,7 +448,10 @@ def load_file(file_name: str) -> str:
 
 
 def play_sound(logger):
+    if not SOUND:
+        return
     try:
+        import simpleaudio as sa
         sound_path = load_file("assets/sounds/Blow_edited.wav")
         wave_obj = sa.WaveObject.from_wave_file(sound_path)
         play_obj = wave_obj.play()
@@ -71,6 +460,43 @@ def play_sound(logger):
         logger.debug(f"An error occurred while playing sound: {e}")
 
 
+def self_command():
+    # Nuitka defines __compiled__, its onefile binary is then the program itself
+    if "__compiled__" in globals():
+        return [sys.argv[0]]
+    return [sys.executable, os.path.abspath(__file__)]
+
+
+def profile_startup(logger, runs=STARTUP_RUNS, budget=STARTUP_BUDGET):
+    command = self_command()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command + ["--help"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    median = times[len(times) // 2]
+    logger.info(f"Cold start of {os.path.basename(command[-1])} --help: median {median * 1000:.0f} ms, best {times[0] * 1000:.0f} ms over {runs} runs (budget {budget * 1000:.0f} ms)")
+
+    if "__compiled__" not in globals():
+        # Same numbers as python -X importtime, for the modules imported by the script itself
+        process = subprocess.run([sys.executable, "-X", "importtime"] + command[1:] + ["--help"], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        imports = []
+        for line in process.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[1].strip().isdigit() and fields[2].startswith(" ") and not fields[2].startswith("  "):
+                imports.append((int(fields[1]), fields[2].strip()))
+        imports.sort(reverse=True)
+        logger.info(f"Imports: {sum(us for us, _ in imports) / 1000:.0f} ms in {len(imports)} top level modules")
+        for us, name in imports[:10]:
+            logger.info(f"  {us / 1000:7.1f} ms  {name}")
+
+    if median > budget:
+        logger.warning(f"Startup is over its budget of {budget * 1000:.0f} ms")
+        return False
+    return True
+
+
 def set_env_var_unix(name, value, shell="bash"):
     home = os.path.expanduser("~")
     rc_file = f".{shell}rc"
@@ -92,10 +518,10 @@ def set_env_var(name, value):
     
 
 def format_file_size(file=None, num_bytes=None):
-    if num_bytes:
+    if num_bytes is not None:
         file_size_bytes = num_bytes
     else:
-        file_size_bytes = os.path.getsize(file)
+        file_size_bytes = source_size(file)
     size_in_kb = file_size_bytes / 1024
     size_in_mb = file_size_bytes / (1024 * 1024)
     size_in_gb = file_size_bytes / (1024 * 1024 * 1024)
@@ -112,16 +538,11 @@ def file_size(file=None, num_bytes=None):
     return f"{size:.2f} {unit}"
     
 
-def calculate_upload_speed(file, start_time):
-    elapsed_time_seconds = time.time() - start_time
-    file_size, size_unit = format_file_size(file)
-
-    if size_unit == "GB":
-        average_speed = (file_size * 1024) / elapsed_time_seconds  # Convert GB to MB and calculate MB/s
-        speed_unit = "MB/s"
-    else:
-        average_speed = file_size / elapsed_time_seconds  # MB/s
-        speed_unit = "MB/s"
+def calculate_upload_speed(file, start_time, num_bytes=None):
+    elapsed_time_seconds = max(time.time() - start_time, 1e-6)
+    if num_bytes is None:
+        num_bytes = source_size(file)
+    average_speed, size_unit = format_file_size(num_bytes=num_bytes / elapsed_time_seconds)
 
     if elapsed_time_seconds >= 60:
         minutes = int(elapsed_time_seconds // 60)
@@ -130,17 +551,240 @@ def calculate_upload_speed(file, start_time):
     else:
         elapsed_time = f"{elapsed_time_seconds:.2f}s"
     
-    return f"{average_speed:.2f} {speed_unit}", elapsed_time
+    return f"{average_speed:.2f} {size_unit}/s", elapsed_time
+
+
+class TransferMetrics:
+    """
+    Per-file transfer records (bytes, retries and seconds spent in each phase)
+    and run-wide phases, written as JSON lines while the run goes and as a
+    final JSON report and/or Prometheus textfile. Totals are kept as records
+    come, so only the last max_records of them need to stay in memory.
+    """
+
+    def __init__(self, jsonl_path=None, max_records=None):
+        self.started = time.time()
+        self.records = collections.deque(maxlen=max_records)
+        self.totals = {}
+        self.phases = {}
+        self.lock = threading.Lock()
+        self.jsonl = open(jsonl_path, "a") if jsonl_path else None
+
+    def add_phase(self, phase, seconds):
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def record(self, direction, name, server, num_bytes, phases, retries=0, status="ok", **extra):
+        record = {"time": time.time(), "direction": direction, "name": name, "server": server, "bytes": num_bytes,
+                  "seconds": round(sum(phases.values()), 6), "phases": {key: round(value, 6) for key, value in phases.items()},
+                  "retries": retries, "status": status, **extra}
+        with self.lock:
+            self.records.append(record)
+            key = (direction, server)
+            total = self.totals.setdefault(key, {"direction": direction, "server": server, "files": 0, "failed": 0, "bytes": 0, "seconds": 0, "retries": 0})
+            total["files" if status == "ok" else "failed"] += 1
+            total["bytes"] += num_bytes
+            total["seconds"] += record["seconds"]
+            total["retries"] += retries
+            if self.jsonl:
+                self.jsonl.write(json.dumps(record) + "\n")
+                self.jsonl.flush()
+        return record
+
+    def report(self):
+        with self.lock:
+            records = list(self.records)
+            totals = [dict(total) for total in self.totals.values()]
+            phases = dict(self.phases)
+        duration = time.time() - self.started
+        for total in totals:
+            # Throughput while transferring, independent of the concurrency of the run
+            total["throughput_bps"] = total["bytes"] / total["seconds"] if total["seconds"] else 0
+        # Failed transfers record 0 bytes
+        ok_bytes = sum(total["bytes"] for total in totals)
+        return {
+            "started": self.started,
+            "duration": duration,
+            "files": sum(total["files"] for total in totals),
+            "failed": sum(total["failed"] for total in totals),
+            "bytes": ok_bytes,
+            "throughput_bps": ok_bytes / duration if duration else 0,
+            "retries": sum(total["retries"] for total in totals),
+            "phases": phases,
+            "servers": totals,
+            "transfers": records,
+        }
+
+    def write_report(self, path):
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def write_prometheus(self, path):
+        report = self.report()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP gofilecli_{name} {help_text}")
+            lines.append(f"# TYPE gofilecli_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+                lines.append(f"gofilecli_{name}{{{label_text}}} {value}" if label_text else f"gofilecli_{name} {value}")
+
+        servers = report["servers"]
+        metric("run_timestamp_seconds", "gauge", "Start time of the last run.", [({}, report["started"])])
+        metric("run_duration_seconds", "gauge", "Duration of the last run.", [({}, round(report["duration"], 3))])
+        metric("run_throughput_bytes_per_second", "gauge", "Bytes transferred per second of run.", [({}, round(report["throughput_bps"], 1))])
+        metric("transfer_files", "gauge", "Files transferred in the last run.", [({"direction": t["direction"], "server": t["server"], "status": "ok"}, t["files"]) for t in servers] + [({"direction": t["direction"], "server": t["server"], "status": "failed"}, t["failed"]) for t in servers])
+        metric("transfer_bytes", "gauge", "Bytes transferred in the last run.", [({"direction": t["direction"], "server": t["server"]}, t["bytes"]) for t in servers])
+        metric("transfer_seconds", "gauge", "Seconds spent transferring in the last run.", [({"direction": t["direction"], "server": t["server"]}, round(t["seconds"], 3)) for t in servers])
+        metric("transfer_throughput_bytes_per_second", "gauge", "Per transfer throughput by server.", [({"direction": t["direction"], "server": t["server"]}, round(t["throughput_bps"], 1)) for t in servers])
+        metric("transfer_retries", "gauge", "Retries in the last run.", [({"direction": t["direction"], "server": t["server"]}, t["retries"]) for t in servers])
+        metric("phase_seconds", "gauge", "Seconds spent in each phase in the last run.", [({"phase": phase}, round(seconds, 3)) for phase, seconds in report["phases"].items()])
+        # Written aside then renamed, as the node_exporter textfile collector expects
+        with open(path + ".tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        if self.jsonl:
+            self.jsonl.close()
+            self.jsonl = None
+
+
+class LocalFile(str):
+    """
+    Path of a scanned file carrying the size and mtime of its single stat, so
+    the upload never stats it again. Still a str for open() and os.path.
+    """
+
+    def __new__(cls, path, size, mtime):
+        self = super().__new__(cls, path)
+        self.size = size
+        self.mtime = mtime
+        return self
+
+    @classmethod
+    def of(cls, path):
+        if isinstance(path, cls):
+            return path
+        stat = os.stat(path)
+        return cls(path, stat.st_size, stat.st_mtime)
+
+
+def match_path(path, pattern):
+    # Unlike fnmatch alone, "*" stays within one path component while "**"
+    # stands for any number of them ("releases/**/*.zip")
+    def match(parts, patterns):
+        if not patterns:
+            return not parts
+        if patterns == ["**"]:
+            # A trailing "**" matches everything inside, not the folder itself
+            return bool(parts)
+        if patterns[0] == "**":
+            return any(match(parts[i:], patterns[1:]) for i in range(len(parts) + 1))
+        return bool(parts) and fnmatch.fnmatchcase(parts[0], patterns[0]) and match(parts[1:], patterns[1:])
+
+    return match(path.split("/"), pattern.split("/"))
+
+
+class IgnoreRules:
+    """
+    Subset of the .gitignore syntax read from .gofileignore files and the
+    --exclude globs. A pattern matches the name of a file or folder at any depth,
+    or the path relative to its .gofileignore when it starts with or contains a
+    "/". A trailing "/" matches folders only, "!" takes a match back and "#" starts a comment.
+    The last matching rule wins, rules of deeper .gofileignore files coming last.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+
+    def extend(self, base, lines):
+        rules = list(self.rules)
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            line = line[1:] if negate else line
+            folders_only = line.endswith("/")
+            anchored = "/" in line.rstrip("/")
+            pattern = line.strip("/")
+            if pattern:
+                rules.append((base, pattern, anchored, folders_only, negate))
+        return IgnoreRules(rules) if len(rules) > len(self.rules) else self
+
+    def ignored(self, path, is_dir):
+        ignored = False
+        name = posixpath.basename(path)
+        for base, pattern, anchored, folders_only, negate in self.rules:
+            if folders_only and not is_dir:
+                continue
+            if base and not path.startswith(base + "/"):
+                continue
+            target = (path[len(base) + 1:] if base else path) if anchored else name
+            if match_path(target, pattern):
+                ignored = not negate
+        return ignored
+
+
+def scan_files(folderPath, exclude=(), include=(), logger=None):
+    # Depth-first os.scandir walk yielding a LocalFile as soon as its folder is
+    # read, so uploads can start while the scan goes on. On most platforms the
+    # directory entry already holds the file type, leaving one stat per file.
+    rules = IgnoreRules().extend("", [".DS_Store", IGNORE_FILE, *exclude])
+    stack = [("", rules)]
+    # Symlinked folders are followed, each folder at most once so that a link
+    # to one of its parents does not loop
+    visited = set()
+    while stack:
+        relative_dir, rules = stack.pop()
+        directory = os.path.join(folderPath, relative_dir)
+        try:
+            stat = os.stat(directory)
+        except OSError as e:
+            if logger:
+                logger.warning(f"Could not list '{directory}': {e}")
+            continue
+        if (stat.st_dev, stat.st_ino) in visited:
+            if logger:
+                logger.warning(f"Skipping '{directory}', already scanned through another link")
+            continue
+        visited.add((stat.st_dev, stat.st_ino))
+        try:
+            with open(os.path.join(directory, IGNORE_FILE)) as f:
+                rules = rules.extend(relative_dir, f.read().splitlines())
+        except OSError:
+            pass
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            if logger:
+                logger.warning(f"Could not list '{directory}': {e}")
+            continue
+        folders = []
+        for entry in entries:
+            relative_path = posixpath.join(relative_dir, entry.name)
+            try:
+                is_dir = entry.is_dir(follow_symlinks=True)
+                if rules.ignored(relative_path, is_dir):
+                    continue
+                if is_dir:
+                    folders.append((relative_path, rules))
+                elif not include or any(match_path(relative_path, pattern) or fnmatch.fnmatchcase(entry.name, pattern) for pattern in include):
+                    stat = entry.stat()
+                    yield LocalFile(entry.path, stat.st_size, stat.st_mtime)
+            except OSError as e:
+                if logger:
+                    logger.warning(f"Could not read '{entry.path}': {e}")
+        # Popped in name order
+        stack.extend(reversed(folders))
 
 
 def get_file_paths(folderPath):
-    filePaths = []
-    for root, directories, files in os.walk(folderPath):
-        for file in files:
-            if ".DS_Store" not in file:
-                file_path = os.path.join(root, file)
-                filePaths.append(file_path)
-    return filePaths
+    return list(scan_files(folderPath))
 
 
 def check_folderPath(path):
@@ -149,93 +793,476 @@ def check_folderPath(path):
     return path
 
 
-def getservers(logger):
-    servers = []
-    # response = requests.get("https://api.gofile.io/servers").json()
-    response = reqst("https://api.gofile.io/servers", logger=logger, method="get")
-    if response["status"] == "ok":
-        for server in response["data"]["servers"]:
-            servers.append(server["name"])
-        logger.debug(f"{response}")
-        return servers
+def get_cache_dir(*parts):
+    if platform.system() == "Windows":
+        base = os.getenv("LOCALAPPDATA", os.path.expanduser("~"))
     else:
-        logger.error(f"{response}")
-        return None
-    
+        base = os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return check_folderPath(os.path.join(base, "gofilecli", *parts))
+
+
+def file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in read_in_chunks(f, CHUNK_SIZE):
+            check_stop()
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def check_stop():
+    if STOP.is_set():
+        raise GoFileInterrupted("Interrupted")
+
+
+def stop_transfers(*executors):
+    # Ctrl-C: queued transfers are dropped and the running ones stop at their
+    # next chunk, so leaving the executors does not wait for them to finish
+    STOP.set()
+    for executor in executors:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class StreamDigest:
+    """
+    md5 of a download computed from the bytes as they are written. A write at
+    the end of the hashed prefix is hashed right away; what lands ahead of it
+    (later segments, the part of a resumed download already on disk) is read
+    back by finish() once the file is complete, while still in the page cache.
+    """
+
+    def __init__(self):
+        self.md5 = hashlib.md5()
+        self.position = 0
+        self.lock = threading.Lock()
+
+    def update(self, offset, data):
+        with self.lock:
+            if offset == self.position:
+                self.md5.update(data)
+                self.position += len(data)
+
+    def finish(self, path=None):
+        if path is not None:
+            with open(path, "rb") as f:
+                f.seek(self.position)
+                for chunk in read_in_chunks(f, CHUNK_SIZE):
+                    self.md5.update(chunk)
+        return self.md5.hexdigest()
+
+
+def parse_size(value):
+    # "50M", "1.5G", "800k" or plain bytes, binary multiples like curl
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([kmgt]?)i?b?\s*", str(value), re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {value}")
+    return int(float(match.group(1)) * 1024 ** " kmgt".index(match.group(2).lower() or " "))
+
+
+def parse_schedule(value):
+    # "08:00-18:00=10M,22:00-06:00=0": rate of each time of day window, a
+    # window may wrap around midnight and 0 means unlimited
+    windows = []
+    for item in value.split(","):
+        match = re.fullmatch(r"\s*(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})=(\S+)\s*", item)
+        if not match:
+            raise argparse.ArgumentTypeError(f"invalid schedule window: {item}")
+        start_hour, start_minute, end_hour, end_minute, rate = match.groups()
+        windows.append((int(start_hour) * 60 + int(start_minute), int(end_hour) * 60 + int(end_minute), parse_size(rate)))
+    return windows
+
+
+class BandwidthLimiter:
+    """
+    Token bucket: each chunk sent or received takes its size in tokens,
+    refilled at `rate` bytes per second, and callers going into debt sleep it
+    off. The bucket only holds 50 ms of tokens and transfers read slices of
+    about that size while limited, so the flow stays smooth instead of bursty.
+    With a schedule the rate follows the time of day, `rate` applying outside
+    of its windows. A rate of 0 is unlimited.
+    """
+
+    def __init__(self, rate=0, schedule=None):
+        self.default_rate = rate
+        self.schedule = schedule or []
+        self.rate = self.scheduled_rate()
+        self.checked = self.last = time.monotonic()
+        self.tokens = 0
+        self.lock = threading.Lock()
+
+    def scheduled_rate(self):
+        now = time.localtime()
+        minute = now.tm_hour * 60 + now.tm_min
+        for start, end, rate in self.schedule:
+            if start <= minute < end or (end < start and (minute >= start or minute < end)):
+                return rate
+        return self.default_rate
+
+    def consume(self, num_bytes):
+        with self.lock:
+            now = time.monotonic()
+            if self.schedule and now - self.checked >= 1:
+                self.rate, self.checked = self.scheduled_rate(), now
+            if not self.rate:
+                self.last = now
+                return
+            self.tokens = min(self.rate / 20, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= num_bytes
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+class TransferSettings:
+    """
+    Where uploadfile() and downloadFile() send their data, how they are limited,
+    where they record their metrics and the ApiClient of the calls they make on
+    the way. The CLI builds one from its options (get_transfers()), each
+    GoFileClient holds its own.
+    """
+
+    def __init__(self, server_url=DEFAULT_SERVER_URL, limiter=None, transfer_rate=0, metrics=None, api=None):
+        self.server_url = server_url
+        self.limiter = limiter
+        self.transfer_rate = transfer_rate
+        self.metrics = metrics
+        self.api = api
+
+    def limiters(self):
+        # The shared bucket and, with a per-transfer rate, one for this transfer (a file, all of its segments)
+        own = BandwidthLimiter(self.transfer_rate) if self.transfer_rate else None
+        return tuple(bucket for bucket in (self.limiter, own) if bucket is not None)
+
+
+def get_transfers():
+    return TransferSettings(SERVER_URL, LIMITER, TRANSFER_RATE, METRICS, get_api())
+
+
+def slice_size(size, limiters=()):
+    # Chunks of about 50 ms at the lowest active rate
+    rates = [bucket.rate for bucket in limiters if bucket.rate]
+    if not rates:
+        return size
+    return max(16 * 1024, min(size, int(min(rates) / 20)))
+
+
+def throttle(num_bytes, limiters=()):
+    for bucket in limiters:
+        bucket.consume(num_bytes)
+
+
+def throttled(chunks, limiters=()):
+    for chunk in chunks:
+        throttle(len(chunk), limiters)
+        yield chunk
+
+
+class HashIndex:
+    """
+    SQLite index of the GoFile files already holding a content (md5 and size),
+    used to copy duplicates server-side instead of uploading them again. A local
+    file is only hashed when a known content has its size, and its md5 is cached
+    by path, size and mtime so unchanged files are not read twice. The least
+    recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, path=None, max_entries=HASH_INDEX_ENTRIES):
+        self.path = path or os.path.join(get_cache_dir(), "hashes.sqlite")
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, md5 TEXT, accessed REAL)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS contents (id TEXT PRIMARY KEY, md5 TEXT, size INTEGER, name TEXT, folder TEXT, accessed REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS contents_size ON contents (size)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS contents_md5 ON contents (md5)")
+        self.evict()
+
+    def evict(self):
+        with self.lock, self.db:
+            for table in ("files", "contents"):
+                count = self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                if count > self.max_entries:
+                    self.db.execute(f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY accessed LIMIT ?)", (count - self.max_entries,))
+
+    def hash(self, path):
+        path = LocalFile.of(path)
+        key = os.path.abspath(path)
+        with self.lock, self.db:
+            row = self.db.execute("SELECT md5 FROM files WHERE path = ? AND size = ? AND mtime = ?", (key, path.size, path.mtime)).fetchone()
+            if row:
+                self.db.execute("UPDATE files SET accessed = ? WHERE path = ?", (time.time(), key))
+                return row[0]
+        md5 = file_md5(path)
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", (key, path.size, path.mtime, md5, time.time()))
+        return md5
+
+    def has_size(self, size):
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM contents WHERE size = ? LIMIT 1", (size,)).fetchone() is not None
+
+    def lookup(self, md5, size, name, folderId):
+        # A file of the destination with the same name first, any other copy otherwise
+        with self.lock, self.db:
+            row = self.db.execute("SELECT id, name, folder FROM contents WHERE md5 = ? AND size = ? ORDER BY (folder = ? AND name = ?) DESC, accessed DESC LIMIT 1",
+                                  (md5, size, folderId, name)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE contents SET accessed = ? WHERE id = ?", (time.time(), row[0]))
+        return {"id": row[0], "name": row[1], "folder": row[2]}
+
+    def add(self, md5, size, fileId, name, folderId):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO contents VALUES (?, ?, ?, ?, ?, ?)", (fileId, md5, size, name, folderId, time.time()))
+
+    def forget(self, fileId):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM contents WHERE id = ?", (fileId,))
+
+    def prune(self, folderId, present):
+        # Forgets the entries of folderId that its listing no longer has
+        with self.lock:
+            ids = [row[0] for row in self.db.execute("SELECT id FROM contents WHERE folder = ?", (folderId,))]
+        for fileId in ids:
+            if fileId not in present:
+                self.forget(fileId)
+
+    def close(self):
+        self.db.close()
+
+
+def run_bounded(executor, jobs, tasks):
+    # Submits (key, function, *args) tasks while keeping at most jobs * 2 in
+    # flight and yields (key, result) as they complete.
+    pending = {}
+    try:
+        for key, function, *args in tasks:
+            if len(pending) >= jobs * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+            pending[executor.submit(function, *args)] = key
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+    except KeyboardInterrupt:
+        stop_transfers(executor)
+        raise
+
+
+def getservers(logger, api=None):
+    # The list is kept for SERVER_CACHE_TTL so a long running process (the
+    # daemon) does not ask for it before every upload
+    global SERVERS
+    if api is None and SERVERS and time.time() - SERVERS[0] < SERVER_CACHE_TTL:
+        return SERVERS[1]
+    servers = (api or get_api()).servers()
+    logger.debug(f"Servers: {servers}")
+    if api is None:
+        SERVERS = (time.time(), servers)
+    return servers
+
 
 def ping_server(url, logger, num_requests=4, delay=0.1):
+    # Requests go through one keep-alive session so only the first one pays
+    # for the TCP/TLS handshake, which is left out of the average.
     response_times = []
-    for _ in range(num_requests):
-        try:
-            start_time = time.time()
-            response = requests.head(url)
-            response_time = time.time() - start_time
-            if response.status_code == 200:
-                response_times.append(response_time)
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error: {e}")
-        time.sleep(delay)
+    session = requests.Session()
+    try:
+        for index in range(num_requests):
+            try:
+                start_time = time.time()
+                response = session.head(url, timeout=PROBE_TIMEOUT)
+                response_time = time.time() - start_time
+                if response.status_code == 200 and index > 0:
+                    response_times.append(response_time)
+            except requests.exceptions.RequestException as e:
+                logger.debug(f"Error: {e}")
+            time.sleep(delay)
+        throughput = probe_throughput(session, url, logger)
+    finally:
+        session.close()
     if response_times:
         avg_response = sum(response_times) / len(response_times)
-        return avg_response
+        return avg_response, throughput
     else:
+        return float('inf'), 0
+
+
+def probe_throughput(session, url, logger, max_bytes=PROBE_BYTES):
+    # Bytes per second over a small GET on a warm connection
+    try:
+        start_time = time.time()
+        received = 0
+        with session.get(url, stream=True, timeout=PROBE_TIMEOUT) as response:
+            for chunk in response.iter_content(64 * 1024):
+                received += len(chunk)
+                if received >= max_bytes:
+                    break
+        elapsed = time.time() - start_time
+        return received / elapsed if received and elapsed > 0 else 0
+    except requests.exceptions.RequestException as e:
+        logger.debug(f"Throughput probe of {url} failed: {e}")
+        return 0
+
+
+def server_score(avg_time, throughput):
+    # Estimated seconds to send a 100 MB file: lower is better
+    if avg_time == float('inf'):
         return float('inf')
-    
+    if not throughput:
+        return avg_time * 1000
+    return avg_time + 100 * 1024 * 1024 / throughput
 
-def test_servers(servers, logger):
-    best_server = None
-    best_time = float('inf')
-    for server in servers:
-        logger.debug(f"Pinging {server}...")
-        url = f"https://{server}.gofile.io"
-        avg_time = ping_server(url, logger)
-        logger.debug(f"Average response time for {server}: {avg_time:.2f} ms")
-        if avg_time < best_time:
-            best_time = avg_time
-            best_server = server
-    if best_server:
-        logger.debug(f"\nThe best server is {best_server} with an average response time of {best_time:.2f} ms.")
-    else:
-        logger.error("All pings failed.")
-    return best_server
+
+def load_server_cache(servers):
+    # {server: (average response time, throughput)} of the servers probed less
+    # than SERVER_CACHE_TTL ago, each server with its own probe time
+    try:
+        with open(os.path.join(get_cache_dir(), "servers.json")) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    now = time.time()
+    return {server: (float('inf') if entry["latency"] is None else entry["latency"], entry["throughput"])
+            for server, entry in cache.get("servers", {}).items()
+            if server in servers and now - entry.get("time", 0) <= SERVER_CACHE_TTL}
+
+
+def save_server_cache(probes):
+    path = os.path.join(get_cache_dir(), "servers.json")
+    try:
+        with open(path) as f:
+            cache = json.load(f).get("servers", {})
+    except (OSError, ValueError, AttributeError):
+        cache = {}
+    now = time.time()
+    for server, (avg_time, throughput) in probes.items():
+        cache[server] = {"latency": None if avg_time == float('inf') else avg_time, "throughput": throughput, "time": now}
+    with open(path + ".tmp", "w") as f:
+        json.dump({"servers": cache}, f)
+    os.replace(path + ".tmp", path)
+
+
+def probe_servers(servers, logger, server_url=None):
+    # {server: (average response time, throughput)}, the servers probed in parallel
+    server_url = server_url or SERVER_URL
+    with ThreadPoolExecutor(max_workers=len(servers) or 1) as executor:
+        probes = {server: executor.submit(ping_server, server_url.format(server=server), logger) for server in servers}
+        results = {server: probe.result() for server, probe in probes.items()}
+    for server, (avg_time, throughput) in results.items():
+        logger.debug(f"{server}: average response time {avg_time * 1000:.2f} ms, throughput {file_size(num_bytes=int(throughput))}/s, score {server_score(avg_time, throughput):.2f}s")
+    return results
+
+
+class ServerScheduler:
+    """
+    Spreads uploads over the storage servers. A file is given its server when
+    it starts, picking the one expected to be done with it first from the bytes
+    the server is already sending and the throughput its recent uploads reached
+    (moving average), so a server that slows down gets less of the pending work.
+    A failed upload benches its server for a cooldown doubling while failures repeat.
+    """
+
+    def __init__(self, servers, logger, probes=None):
+        self.servers = list(servers)
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.throughput = dict.fromkeys(self.servers)
+        self.active = dict.fromkeys(self.servers, 0)
+        self.failures = dict.fromkeys(self.servers, 0)
+        self.benched = dict.fromkeys(self.servers, 0.0)
+        self.sent = {server: [0, 0] for server in self.servers}
+        for server, (avg_time, throughput) in (probes or {}).items():
+            if avg_time == float('inf'):
+                self.benched[server] = time.time() + SCHEDULER_COOLDOWN
+            self.throughput[server] = throughput or None
+
+    def rate(self, server):
+        # A server not measured yet is assumed as fast as the best one, so it gets tried
+        known = [rate for rate in self.throughput.values() if rate]
+        return self.throughput[server] or (max(known) if known else 1.0)
+
+    def acquire(self, size, exclude=()):
+        with self.lock:
+            now = time.time()
+            candidates = [server for server in self.servers if server not in exclude] or self.servers
+            healthy = [server for server in candidates if self.benched[server] <= now] or [min(candidates, key=self.benched.get)]
+            server = min(healthy, key=lambda server: (self.active[server] + size) / self.rate(server))
+            self.active[server] += size
+            return server
+
+    def release(self, server, size, seconds, ok):
+        with self.lock:
+            self.active[server] -= size
+            if ok:
+                self.failures[server] = 0
+                self.sent[server][0] += 1
+                self.sent[server][1] += size
+                # Small files measure the latency more than the throughput
+                if size >= SCHEDULER_MIN_SAMPLE and seconds > 0:
+                    previous = self.throughput[server]
+                    self.throughput[server] = size / seconds if previous is None else previous + SCHEDULER_EWMA * (size / seconds - previous)
+                return
+            self.failures[server] += 1
+            if len(self.servers) > 1:
+                cooldown = min(SCHEDULER_MAX_COOLDOWN, SCHEDULER_COOLDOWN * 2 ** (self.failures[server] - 1))
+                self.benched[server] = time.time() + cooldown
+                self.logger.warning(f"Upload to {server} failed, sending the next files to the other servers for {cooldown:.0f}s")
+
+    def best(self):
+        with self.lock:
+            now = time.time()
+            return max(self.servers, key=lambda server: (self.benched[server] <= now, self.throughput[server] or 0))
+
+    def summary(self):
+        return ", ".join(f"{server}: {files} files, {file_size(num_bytes=size)}" + (f" at {file_size(num_bytes=int(self.throughput[server]))}/s" if self.throughput[server] else "")
+                         for server, (files, size) in self.sent.items() if files)
+
+
+def scheduled_upload(scheduler, index, total, folderId, file, logger):
+    # A file whose upload failed is tried once more on another server
+    size = source_size(file)
+    tried = []
+    while True:
+        server = scheduler.acquire(size, exclude=tried)
+        start_time = time.perf_counter()
+        result, size = upload_worker(index, total, server, folderId, file, logger)
+        scheduler.release(server, size, time.perf_counter() - start_time, bool(result))
+        tried.append(server)
+        if result or len(tried) >= min(2, len(scheduler.servers)):
+            return result, size
+        logger.info(f"Retrying '{file}' on another server")
 
 
 def get_stats(logger):
-    headers = {'authorization': f'Bearer {TOKEN}',}
-    # data = requests.get(f'https://api.gofile.io/accounts/{ACCOUNT_ID}', headers=headers).json()
-    data = reqst(f'https://api.gofile.io/accounts/{ACCOUNT_ID}', headers=headers, logger=logger, method="get")
-    if data["status"] == "ok":
-        stats = data["data"]["statsCurrent"]
-        logger.info("Account stats:")
-        logger.info(f"Total files: {stats['fileCount']}")
-        logger.info(f"Total folders: {stats['folderCount']}")
-        size = file_size(num_bytes=stats['storage'])
-        logger.info(f"Total size: {size}")
-        traffic = file_size(num_bytes=stats['trafficWebDownloaded'])
-        logger.info(f"Total traffic: {traffic}")
-    else:
-        logger.error(f"{data}")
-        return None
+    stats = get_cache().account(ACCOUNT_ID)["statsCurrent"]
+    logger.info("Account stats:")
+    logger.info(f"Total files: {stats['fileCount']}")
+    logger.info(f"Total folders: {stats['folderCount']}")
+    size = file_size(num_bytes=stats['storage'])
+    logger.info(f"Total size: {size}")
+    traffic = file_size(num_bytes=stats['trafficWebDownloaded'])
+    logger.info(f"Total traffic: {traffic}")
 
 
 def get_rootfolder(logger):
-    headers = {'authorization': f'Bearer {TOKEN}',}
-    # data = requests.get(f'https://api.gofile.io/accounts/{ACCOUNT_ID}', headers=headers).json()
-    data = reqst(f'https://api.gofile.io/accounts/{ACCOUNT_ID}', headers=headers, logger=logger, method="get")
-    root_folder = data.get("data", {}).get("rootFolder", {})
+    root_folder = get_cache().root_folder(ACCOUNT_ID)
     if root_folder:
         return root_folder
     else:
-        logger.error(f"{data}")
+        logger.error(f"No root folder found for account {ACCOUNT_ID}")
         return None
 
 
 def get_code(folderId, logger):
-    headers = {'authorization': f'Bearer {TOKEN}',}
-    params = (('wt', '4fd6sg89d7s6'),('cache', 'false'),)
-    # data = requests.get(f'https://api.gofile.io/contents/{folderId}', headers=headers, params=params).json()
-    data = reqst(f'https://api.gofile.io/contents/{folderId}', headers=headers, params=params, logger=logger, method="get")
-    code = data.get("data", {}).get("code", {})
+    data = get_cache().contents(folderId, max_age=math.inf)
+    code = data.get("code", {})
     if code:
         return code
     else:
@@ -243,41 +1270,17 @@ def get_code(folderId, logger):
         return None
 
 
-def get_children(id, logger):
-    headers = {'authorization': f'Bearer {TOKEN}',}
-    params = (('wt', '4fd6sg89d7s6'),('cache', 'false'),)
-    # data = requests.get(f'https://api.gofile.io/contents/{id}', headers=headers, params=params).json()
-    data = reqst(f'https://api.gofile.io/contents/{id}', headers=headers, params=params, logger=logger, method="get")
-    children = data.get("data", {}).get("children", {})
-    if children:
-        return children
-    else:
-        if data["status"] == "error-rateLimit":
-            logger.warning("Rate limit reached, waiting 30 seconds")
-            time.sleep(30)
-            return get_children(id, logger)
-        else:
-            logger.error(f"{data}")
-            return None
+def get_children(id, logger, api=None, max_age=None):
+    if api is not None:
+        return api.contents(id).get("children", {})
+    return get_cache().contents(id, max_age=max_age).get("children", {})
 
 
 def createfolder(parentFolderId, folderName, logger):
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {TOKEN}"}
-    if folderName:
-        data = {"parentFolderId": parentFolderId, "folderName": folderName}
-    else:
-        data = {"parentFolderId": parentFolderId}
-    # response = requests.post("https://api.gofile.io/contents/createFolder", headers=headers, json=data).json()
-    response = reqst("https://api.gofile.io/contents/createFolder", headers=headers, json=data, logger=logger, method="post")
-    if response["status"] == "ok":
-        name = response["data"]["name"]
-        code = response["data"]["code"]
-        folderId = response["data"]["id"]
-        logger.debug(f"""Folder {name} created with code {code} and folderId {folderId}""")
-        return folderId
-    else:
-        logger.error(f"{response}")
-        return None
+    data = get_api().create_folder(parentFolderId, folderName)
+    get_cache().invalidate(parentFolderId)
+    logger.debug(f"""Folder {data["name"]} created with code {data["code"]} and folderId {data["id"]}""")
+    return data["id"]
 
 
 def read_in_chunks(file_object, CHUNK_SIZE):
@@ -288,101 +1291,828 @@ def read_in_chunks(file_object, CHUNK_SIZE):
         yield data
 
 
-def uploadfile(serverName, folderId, filePath, logger):
-    # reference : https://api.video/blog/tutorials/upload-a-big-video-file-using-python/
-    start_time = time.time()
-    # CHUNK_SIZE = 6000000
-    # content_size = os.stat(filePath).st_size
-    # f = open(filePath, "rb")
-    # index = 0
-    # offset = 0
-    # headers = {"Authorization": f"Bearer {TOKEN}", 'content-type': 'multipart/form-data',}
-    # with tqdm(total=content_size, unit='B', unit_scale=True, desc='Uploading', leave=False) as progress_bar:
-    #     for chunk in read_in_chunks(f, CHUNK_SIZE):
-    #         offset = index + len(chunk)
-    #         headers['Content-Range'] = 'bytes %s-%s/%s' % (index, offset - 1, content_size)
-    #         index = offset
-    #         try:
-    #             # file = {"file": chunk, 'folderId': (None, folderId)}
-    #             # response = requests.post(f"https://{serverName}.gofile.io/contents/uploadfile", files=file, headers=headers)
-    #             # files = {"file": chunk}
-    #             # data = {"folderId": folderId}
-    #             files = {"file": chunk,}
-    #             response = requests.post(f"https://{serverName}.gofile.io/contents/uploadfile",files=files,headers=headers)
-    #             logger.debug("r: %s, Content-Range: %s" % (response, headers['Content-Range']))
-    #             progress_bar.update(len(chunk))
-    #         except Exception as e:
-    #             logger.error(f"Error: {e}")
-    # logger.debug(f"{response.text}")
-    # response = response.json()
-    command = [
-        "curl",
-        "-X", "POST",
-        f"https://{serverName}.gofile.io/contents/uploadfile",
-        "-H", f"Authorization: Bearer {TOKEN}",
-        "-F", f"file=@{filePath}",
-        "-F", f"folderId={folderId}",
-    ]
-    response = subprocess.run(command, capture_output=True, text=True)
+def get_session():
+    # One pooled session for the whole run: uploads and downloads reuse the
+    # same keep-alive connections (and TLS sessions) instead of opening new ones.
+    global SESSION
+    with SESSION_LOCK:
+        if SESSION is None:
+            SESSION = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=64)
+            SESSION.mount("https://", adapter)
+            SESSION.mount("http://", adapter)
+        return SESSION
+
+
+class StreamSource:
+    """
+    Upload source generated on the fly instead of read from a file: it has a
+    name, a length known up front and open() returning a file-like reader.
+    """
+
+    name = None
+    size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+        return self.name
+
+    def open(self):
+        raise NotImplementedError
+
+
+class ChunkReader:
+    """
+    File-like read() over an iterator of byte strings.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+
+    def read(self, size=-1):
+        if not self.buffer:
+            self.buffer = next(self.chunks, b"")
+        if size is None or size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def close(self):
+        self.chunks.close()
+
+
+class TarBundle(StreamSource):
+    """
+    Small files packed into a tar archive that is generated while it is read,
+    so it is never staged on disk. Its length is known up front from the tar
+    headers and the file sizes, and is sent as the Content-Length.
+    """
+
+    def __init__(self, name, root, files):
+        self.name = name
+        self.entries = []
+        self.size = 2 * tarfile.BLOCKSIZE
+        for path in map(LocalFile.of, files):
+            arcname = os.path.relpath(path, root).replace(os.sep, "/")
+            self.entries.append((path, arcname, path.size, int(path.mtime)))
+            self.size += len(self.header(arcname, path.size, int(path.mtime))) + path.size + (-path.size % tarfile.BLOCKSIZE)
+
+    @staticmethod
+    def header(arcname, size, mtime):
+        info = tarfile.TarInfo(arcname)
+        info.size = size
+        info.mtime = mtime
+        info.mode = 0o644
+        return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+    def chunks(self, chunk_size=CHUNK_SIZE):
+        for path, arcname, size, mtime in self.entries:
+            yield self.header(arcname, size, mtime)
+            with open(path, "rb") as f:
+                left = size
+                while left > 0:
+                    # A file that shrank since it was listed is zero-filled to keep the announced length
+                    data = f.read(min(chunk_size, left)) or bytes(min(chunk_size, left))
+                    left -= len(data)
+                    yield data
+            if size % tarfile.BLOCKSIZE:
+                yield bytes(-size % tarfile.BLOCKSIZE)
+        yield bytes(2 * tarfile.BLOCKSIZE)
+
+    def open(self):
+        return ChunkReader(self.chunks())
+
+
+def source_size(file):
+    if isinstance(file, StreamSource):
+        return len(file)
+    return file.size if isinstance(file, LocalFile) else os.path.getsize(file)
+
+
+def read_full(f, size):
+    # read() of a ChunkReader may return less than asked before the end
+    data = b""
+    while len(data) < size:
+        chunk = f.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+class EncryptionKey:
+    """
+    Passphrase of --encrypt and --decrypt. The master key is derived with scrypt
+    under a random salt written in the header of each file, which then gets its
+    own key from a second salt. The files encrypted by one run share the scrypt
+    salt, so scrypt runs once per run, and once per salt met when decrypting.
+    """
+
+    def __init__(self, passphrase):
+        self.passphrase = passphrase
+        self.salt = os.urandom(16)
+
+    def derive(self, salt):
+        return derive_key(self.passphrase, salt)
+
+
+@functools.lru_cache(maxsize=64)
+def derive_key(passphrase, salt):
+    from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+    return Scrypt(salt=salt, length=32, n=2 ** 15, r=8, p=1).derive(passphrase.encode())
+
+
+@functools.lru_cache(maxsize=None)
+def encryption_key(passphrase):
+    # One EncryptionKey per passphrase, so the jobs of the daemon share its salt
+    return EncryptionKey(passphrase)
+
+
+def file_cipher(key, salt):
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    return AESGCM(HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=b"gofilecli file key").derive(key))
+
+
+def chunk_nonce(prefix, index, last):
+    return prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+
+def encrypted_size(size):
+    return ENCRYPTION_HEADER + size + max(1, -(-size // CHUNK_SIZE)) * ENCRYPTION_TAG
+
+
+def decrypted_size(size):
+    return size - ENCRYPTION_HEADER - -(-(size - ENCRYPTION_HEADER) // ENCRYPTED_CHUNK) * ENCRYPTION_TAG
+
+
+def get_crypto_executor():
+    global CRYPTO_EXECUTOR
+    with SESSION_LOCK:
+        if CRYPTO_EXECUTOR is None and (os.cpu_count() or 1) > 1:
+            CRYPTO_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="crypto")
+        return CRYPTO_EXECUTOR
+
+
+def pipeline(jobs):
+    # Runs (function, *args) jobs on the crypto pool, at most two per core in
+    # flight, and yields their results in order; inline on a single core.
+    executor = get_crypto_executor()
+    if executor is None:
+        for function, *args in jobs:
+            yield function(*args)
+        return
+    pending = collections.deque()
+    for function, *args in jobs:
+        pending.append(executor.submit(function, *args))
+        if len(pending) >= 2 * os.cpu_count():
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def encrypt_chunks(reader, size, key, name):
+    # STREAM construction: each chunk is sealed with a nonce made of the file
+    # prefix, its index and a last chunk flag, so chunks cannot be reordered,
+    # dropped or truncated without decryption failing.
+    salt, prefix = os.urandom(16), os.urandom(7)
+    header = ENCRYPTION_MAGIC + key.salt + salt + prefix
+    cipher = file_cipher(key.derive(key.salt), salt)
+    count = max(1, -(-size // CHUNK_SIZE))
+
+    def jobs():
+        for index in range(count):
+            data = read_full(reader, CHUNK_SIZE)
+            if len(data) != min(CHUNK_SIZE, size - index * CHUNK_SIZE):
+                raise GoFileError(f"{name} changed while being encrypted")
+            yield cipher.encrypt, chunk_nonce(prefix, index, index == count - 1), data, header
+        if reader.read(1):
+            raise GoFileError(f"{name} changed while being encrypted")
+
     try:
-        response_json = json.loads(response.stdout)
-    except json.JSONDecodeError:
-        logger.error("Failed to parse response as JSON.")
+        yield header
+        yield from pipeline(jobs())
+    finally:
+        reader.close()
+
+
+def decrypt_chunks(chunks, key):
+    from cryptography.exceptions import InvalidTag
+    reader = ChunkReader(iter(chunks))
+    header = read_full(reader, ENCRYPTION_HEADER)
+    if len(header) != ENCRYPTION_HEADER or not header.startswith(ENCRYPTION_MAGIC):
+        raise GoFileError("Not a file encrypted by gofilecli")
+    key_salt = header[len(ENCRYPTION_MAGIC):len(ENCRYPTION_MAGIC) + 16]
+    cipher = file_cipher(key.derive(key_salt), header[len(ENCRYPTION_MAGIC) + 16:-7])
+    prefix = header[-7:]
+
+    def decrypt(nonce, data):
+        try:
+            return cipher.decrypt(nonce, data, header)
+        except InvalidTag:
+            raise GoFileError("Decryption failed: wrong key or corrupted file")
+
+    def jobs():
+        # One chunk of look-ahead tells which one is the last
+        data, index = read_full(reader, ENCRYPTED_CHUNK), 0
+        while True:
+            following = read_full(reader, ENCRYPTED_CHUNK)
+            yield decrypt, chunk_nonce(prefix, index, not following), data
+            if not following:
+                break
+            data, index = following, index + 1
+
+    yield from pipeline(jobs())
+
+
+class EncryptedFile(StreamSource):
+    """
+    A file or another StreamSource encrypted chunk by chunk with AES-GCM while
+    it is read, chunks being sealed in parallel on multi-core machines.
+    """
+
+    def __init__(self, source, key):
+        self.source = source
+        self.key = key
+        self.name = f"{source}{ENCRYPTED_SUFFIX}"
+        self.size = encrypted_size(source_size(source))
+
+    def open(self):
+        reader = self.source.open() if isinstance(self.source, StreamSource) else open(self.source, "rb")
+        return ChunkReader(encrypt_chunks(reader, source_size(self.source), self.key, str(self.source)))
+
+
+def make_bundles(folderPath, files, threshold=BUNDLE_THRESHOLD, bundle_size=BUNDLE_SIZE):
+    # Splits files into the ones sent as they are and tar bundles of the small
+    # ones, plus a manifest of what each bundle holds
+    bundle_id = uuid.uuid4().hex[:8]
+    large, small = [], []
+    for file in files:
+        (small if source_size(file) < threshold else large).append(file)
+    groups, current, current_size = [], [], 0
+    for file in small:
+        current.append(file)
+        current_size += source_size(file) + 2 * tarfile.BLOCKSIZE
+        if current_size >= bundle_size:
+            groups.append(current)
+            current, current_size = [], 0
+    if current:
+        groups.append(current)
+    bundles = [TarBundle(f"{BUNDLE_PREFIX}{bundle_id}-{index:04d}.tar", folderPath, group) for index, group in enumerate(groups, 1)]
+    manifest = {"version": 1, "bundles": {bundle.name: [{"path": arcname, "size": size, "mtime": mtime} for _, arcname, size, mtime in bundle.entries] for bundle in bundles}}
+    return large, bundles, (f"{BUNDLE_PREFIX}{bundle_id}.json", manifest)
+
+
+class MultipartFileStream:
+    """
+    Streams a multipart/form-data body made of some text fields and one file,
+    reading the file in CHUNK_SIZE buffers so memory use does not depend on its size.
+    The md5 of the file is computed on the way, to be checked against GoFile's.
+    Whatever size urllib3 asks for (16 KiB), a whole buffer is returned: it sends
+    what it gets, and throttling, hashing and progress run once per buffer.
+    """
+
+    def __init__(self, filePath, fields, progress_bar=None, chunk_size=CHUNK_SIZE, limiters=()):
+        self.filePath = filePath
+        self.chunk_size = chunk_size
+        self.progress_bar = progress_bar
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        preamble = b""
+        for name, value in fields.items():
+            preamble += (f"--{self.boundary}\r\n"
+                         f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                         f"{value}\r\n").encode()
+        self.bundle = filePath if isinstance(filePath, StreamSource) else None
+        filename = os.path.basename(str(filePath)).replace('"', '%22')
+        preamble += (f"--{self.boundary}\r\n"
+                     f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                     f"Content-Type: application/octet-stream\r\n\r\n").encode()
+        self.preamble = preamble
+        self.epilogue = f"\r\n--{self.boundary}--\r\n".encode()
+        self.file_size = source_size(filePath)
+        self.len = len(self.preamble) + self.file_size + len(self.epilogue)
+        self.file = None
+        self.limiters = limiters
+        self.rewind()
+
+    def rewind(self):
+        self.close()
+        self.file = self.bundle.open() if self.bundle else open(self.filePath, "rb")
+        self.parts = [self.preamble, self.file, self.epilogue]
+        self.md5 = hashlib.md5()
+        self.first_read = self.last_read = None
+        if self.progress_bar is not None:
+            self.progress_bar.reset(total=self.file_size)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.chunk_size
+        if self.first_read is None:
+            self.first_read = time.perf_counter()
+        while self.parts:
+            part = self.parts[0]
+            if isinstance(part, bytes):
+                data, self.parts[0] = part[:size], part[size:]
+                if not self.parts[0]:
+                    self.parts.pop(0)
+            else:
+                check_stop()
+                data = part.read(slice_size(self.chunk_size, self.limiters))
+                if not data:
+                    self.parts.pop(0)
+                    continue
+                throttle(len(data), self.limiters)
+                self.md5.update(data)
+                if self.progress_bar is not None:
+                    self.progress_bar.update(len(data))
+            if data:
+                return data
+        if self.last_read is None:
+            self.last_read = time.perf_counter()
+        return b""
+
+    def __iter__(self):
+        return read_in_chunks(self, self.chunk_size)
+
+
+def uploadfile(serverName, folderId, filePath, logger, retries=3, token=None, progress=True, transfers=None):
+    transfers = transfers or get_transfers()
+    start_time = time.time()
+    url = f"{transfers.server_url.format(server=serverName)}/contents/uploadfile"
+    fields = {"folderId": folderId} if folderId else {}
+    response = None
+    attempt = 1
+    with tqdm(total=source_size(filePath), unit='B', unit_scale=True, desc=os.path.basename(str(filePath))[:20], leave=False, disable=not progress) as progress_bar:
+        stream = MultipartFileStream(filePath, fields, progress_bar=progress_bar, limiters=transfers.limiters())
+        try:
+            for attempt in range(1, retries + 1):
+                headers = {"Authorization": f"Bearer {token or TOKEN}", "Content-Type": stream.content_type}
+                request_start = time.perf_counter()
+                try:
+                    response = get_session().post(url, data=stream, headers=headers).json()
+                    break
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    logger.warning(f"Upload of '{filePath}' interrupted ({e}), attempt {attempt}/{retries}")
+                    stream.rewind()
+                except ValueError:
+                    logger.error("Failed to parse response as JSON.")
+                    break
+        finally:
+            stream.close()
+    request_end = time.perf_counter()
+    # connect: until the body starts being read, transfer: until its last byte,
+    # confirmation: the wait for GoFile's answer after that
+    first_read = stream.first_read or request_end
+    last_read = stream.last_read or request_end
+    phases = {"connect": first_read - request_start, "transfer": last_read - first_read, "confirmation": request_end - last_read}
+    ok = bool(response) and response.get("status") == "ok"
+    if ok and response["data"].get("md5") and response["data"]["md5"] != stream.md5.hexdigest():
+        logger.error(f"Checksum mismatch for '{filePath}': md5 {stream.md5.hexdigest()}, GoFile stored {response['data']['md5']}")
+        try:
+            # The listing of folderId is invalidated by the caller once its uploads are done
+            transfers.api.delete_contents([response["data"]["id"]])
+        except GoFileError as e:
+            logger.error(f"Could not remove the corrupted upload of '{filePath}': {e}")
+        ok, response = False, None
+    if transfers.metrics:
+        transfers.metrics.record("upload", str(filePath), serverName, stream.file_size if ok else 0, phases, retries=attempt - 1, status="ok" if ok else "failed")
+    if response is None:
         return None
-    speed, elapsed_time = calculate_upload_speed(filePath, start_time)
-    response = response_json
-    if response["status"] == "ok":
+    speed, elapsed_time = calculate_upload_speed(filePath, start_time, num_bytes=stream.file_size)
+    if ok:
         logger.debug(response)
         name = response["data"]["name"]
         downloadPage = response["data"]["downloadPage"]
         parentFolderId = response["data"]["parentFolder"]
         logger.debug(f"""File {name} uploaded to {downloadPage}""")
-        return downloadPage, parentFolderId, speed, elapsed_time
+        return downloadPage, parentFolderId, speed, elapsed_time, response["data"]["id"], stream.md5.hexdigest()
     else:
         logger.error(f"{response}")
         return None
 
 
 def actionFolder(folderId, attributeValue, logger):
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {TOKEN}"}
-    data = {"attribute": "public", "attributeValue": attributeValue}
-    # response = requests.put(f"https://api.gofile.io/contents/{folderId}/update", headers=headers, json=data).json()
-    response = reqst(f"https://api.gofile.io/contents/{folderId}/update", headers=headers, json=data, logger=logger, method="put")
-    if response["status"] == "ok":
-        return True
+    get_api().update(folderId, "public", attributeValue)
+    get_cache().invalidate(folderId)
+    return True
+
+
+def deletecontents(contentsIds, logger):
+    get_api().delete_contents(contentsIds)
+    get_cache().invalidate(*contentsIds)
+    return True
+
+
+def parse_attribute(value):
+    attribute, sep, attributeValue = value.partition("=")
+    if not sep or not attribute:
+        raise argparse.ArgumentTypeError(f"Expected ATTRIBUTE=VALUE, got: {value}")
+    return attribute, attributeValue
+
+
+def resolve_targets(ids, patterns, folderId, action, crawl_jobs, logger):
+    # Ids are taken as is, patterns are matched against the paths of the remote
+    # tree of folderId ("releases/v1.*"). A delete or move of a folder carries its
+    # contents along, so the matches below an already matched folder are dropped.
+    targets = {contentId: {"id": contentId, "name": None, "path": contentId, "parent": None} for contentId in ids}
+    if patterns:
+        selected = []
+        for relative_dir, child in crawl(folderId, crawl_jobs, logger, include_folders=True, max_age=0):
+            path = posixpath.join(relative_dir.replace(os.sep, "/"), child['name'])
+            if not any(match_path(path, pattern) for pattern in patterns):
+                continue
+            if action in ("delete", "move") and any(path.startswith(folder + "/") for folder in selected):
+                continue
+            if child['type'] == "folder":
+                selected.append(path)
+            targets.setdefault(child['id'], {"id": child['id'], "name": child['name'], "path": path, "parent": child.get('parentFolder')})
+    return list(targets.values())
+
+
+def bulk_batch(action, batch, to):
+    # One call for up to BULK_BATCH items, then one per item when the batch is
+    # refused so a single bad id does not fail the others. An error left after
+    # the retries of ApiClient is the status of the items of the batch.
+    api = get_api()
+    try:
+        if action == "delete":
+            data = api.delete_contents([target["id"] for target in batch])
+        else:
+            data = api.move_contents([target["id"] for target in batch], to)
+    except GoFileAPIError as e:
+        if len(batch) == 1:
+            return {batch[0]["id"]: e.status}
+        results = {}
+        for target in batch:
+            results.update(bulk_batch(action, [target], to))
+        return results
+    except GoFileInterrupted:
+        raise
+    except GoFileError as e:
+        return {target["id"]: f"{e}" for target in batch}
+    data = data if isinstance(data, dict) else {}
+    return {target["id"]: (data.get(target["id"]) or {}).get("status", "ok") for target in batch}
+
+
+def bulk_update(target, attribute, attributeValue):
+    try:
+        get_api().update(target["id"], attribute, attributeValue)
+    except GoFileAPIError as e:
+        return {target["id"]: e.status}
+    except GoFileInterrupted:
+        raise
+    except GoFileError as e:
+        return {target["id"]: f"{e}"}
+    return {target["id"]: "ok"}
+
+
+def bulk(action, targets, logger, jobs=8, to=None, attribute=None, dry_run=False):
+    # Every call goes through the shared RateGovernor of get_api(), so the jobs
+    # slow down together when GoFile answers with rate limits
+    start_time = time.time()
+    if dry_run:
+        for target in targets:
+            logger.info(f"Would {action}: {target['path']} ({target['id']})")
+        logger.info(f"Bulk {action}: {len(targets)} items matched, nothing changed (--dry-run)")
+        return {}
+
+    def tasks():
+        if action in ("delete", "move"):
+            for index in range(0, len(targets), BULK_BATCH):
+                yield index, bulk_batch, action, targets[index:index + BULK_BATCH], to
+            return
+        for index, target in enumerate(targets):
+            if action == "rename":
+                if "{name}" in to and not target["name"]:
+                    logger.error(f"Cannot rename {target['id']}: its name is unknown, select it with --match")
+                    continue
+                yield index, bulk_update, target, "name", to.replace("{name}", target["name"] or "")
+            elif action == "set":
+                yield index, bulk_update, target, attribute[0], attribute[1]
+            else:
+                yield index, bulk_update, target, "public", "true" if action == "publish" else "false"
+
+    paths = {target["id"]: target["path"] for target in targets}
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            for _, batch_results in run_bounded(executor, max(1, jobs), tasks()):
+                for contentId, status in batch_results.items():
+                    if status == "ok":
+                        logger.info(f"{action.capitalize()} {paths[contentId]}: ok")
+                    else:
+                        logger.error(f"{action.capitalize()} {paths[contentId]} failed: {status}")
+                    results[contentId] = status
+    finally:
+        # Also when interrupted: the items already changed must not be served from the cache
+        parents = {target["parent"] for target in targets if target["parent"]}
+        get_cache().invalidate(*paths, *parents, *([to] if action == "move" else []))
+    done = sum(status == "ok" for status in results.values())
+    logger.info(f"Bulk {action} summary: {done}/{len(targets)} items ok, {len(targets) - done} failed in {time.time() - start_time:.2f}s")
+    return results
+
+
+def upload_worker(index, total, serverName, folderId, file, logger):
+    size = source_size(file)
+    if folderId:
+        logger.info(f"Uploading file {index + 1}/{total}: '{file}' ({file_size(num_bytes=size)}) to: '{folderId}' on: '{serverName}'")
     else:
-        return response
+        logger.info(f"Uploading file {index + 1}/{total}: '{file}' ({file_size(num_bytes=size)}) on: '{serverName}'")
+    try:
+        result = uploadfile(serverName, folderId, file, logger)
+    except GoFileInterrupted:
+        raise
+    except Exception as e:
+        logger.error(f"Upload of '{file}' failed: {e}")
+        result = None
+    if result:
+        downloadPage, parentFolderId, speed, elapsed_time, fileId, md5 = result
+        logger.info(f"File {index + 1}/{total} uploaded to: {downloadPage} in {elapsed_time} at {speed}")
+    else:
+        logger.error(f"File {index + 1}/{total} failed: '{file}'")
+    return result, size
+
+
+def copy_content(known, folderId, name, md5, logger):
+    # Server-side copy of a known file into folderId under name, returns the id of the copy
+    data = get_api().copy_contents([known["id"]], folderId)
+    copyId = ((data or {}).get(known["id"]) or {}).get("id") if isinstance(data, dict) else None
+    if copyId is None:
+        # Not given by the copy call: the new file of the destination with that content
+        copyId = next((child["id"] for child in get_children(folderId, logger, max_age=0).values()
+                       if child.get("md5") == md5 and child.get("name") == known["name"] and child["id"] != known["id"]), None)
+    if copyId is None:
+        raise GoFileError(f"Copy of {known['id']} not found in {folderId}")
+    if known["name"] != name:
+        get_api().update(copyId, "name", name)
+    return copyId
+
+
+def dedupe_worker(index, total, scheduler, folderId, file, md5_future, dedupe, logger):
+    # Returns (result, size, action): the file is skipped when the destination
+    # already holds the same content under the same name, copied server-side
+    # (under its own name) when any other file does, and uploaded otherwise.
+    # present holds the ids of the destination: its fresh listing and what this
+    # run put there, an index entry missing from it is not skipped on.
+    index_, present, claims, claims_lock = dedupe
+    size = source_size(file)
+    name = os.path.basename(file)
+    md5 = None
+    if md5_future is not None:
+        try:
+            md5 = md5_future.result()
+        except OSError as e:
+            logger.warning(f"Could not hash '{file}': {e}")
+    if not md5 or not folderId:
+        result, size = scheduled_upload(scheduler, index, total, folderId, file, logger)
+        if result:
+            index_.add(result[5], size, result[4], name, result[1])
+            with claims_lock:
+                present.add(result[4])
+        return result, size, "uploaded" if result else "failed"
+    with claims_lock:
+        claim = claims.get(md5)
+        if claim is None:
+            claims[md5] = threading.Event()
+    if claim is not None:
+        # Same content already being sent in this run, its upload is reused
+        claim.wait()
+    result = None
+    try:
+        known = index_.lookup(md5, size, name, folderId)
+        if known and known["folder"] == folderId and known["name"] == name and known["id"] not in present:
+            # Deleted from the destination since it was indexed
+            index_.forget(known["id"])
+            known = index_.lookup(md5, size, name, folderId)
+        if known and known["folder"] == folderId and known["name"] == name:
+            logger.info(f"File {index + 1}/{total} skipped, '{file}' is already in '{folderId}'")
+            result = known["id"]
+            return result, size, "skipped"
+        if known:
+            try:
+                result = copy_content(known, folderId, name, md5, logger)
+                index_.add(md5, size, result, name, folderId)
+                with claims_lock:
+                    present.add(result)
+                logger.info(f"File {index + 1}/{total} copied server-side from '{known['id']}': '{file}'")
+                metrics = get_transfers().metrics
+                if metrics:
+                    metrics.record("upload", file, "api", 0, {}, status="ok", copied_bytes=size)
+                return result, size, "copied"
+            except GoFileError as e:
+                logger.debug(f"Server-side copy of '{file}' failed ({e}), uploading it")
+                index_.forget(known["id"])
+        result, size = scheduled_upload(scheduler, index, total, folderId, file, logger)
+        if result:
+            index_.add(md5, size, result[4], name, result[1])
+            with claims_lock:
+                present.add(result[4])
+        return result, size, "uploaded" if result else "failed"
+    finally:
+        if claim is None:
+            with claims_lock:
+                event = claims[md5]
+                if not result:
+                    # Let a waiting duplicate send it instead
+                    del claims[md5]
+            event.set()
+
+
+def upload_files(servers, parentFolderId, files, jobs, logger, dedupe=True):
+    # Bounded pool: at most jobs * 2 uploads are queued at any time, so the
+    # number of pending futures stays flat whatever the size of the folder.
+    # files may be a generator (scan_files): uploads then start while the scan
+    # goes on, and the total is only known once it ends. servers is a
+    # ServerScheduler, or the name of the one server to use.
+    scheduler = servers if isinstance(servers, ServerScheduler) else ServerScheduler([servers], logger)
+    total = len(files) if isinstance(files, list) else None
+    scanned = []
+    jobs = max(1, jobs)
+    results = {}
+    start_time = time.time()
+    index_ = HashIndex() if dedupe else None
+    present, claims, claims_lock = set(), {}, threading.Lock()
+    if dedupe and parentFolderId:
+        # What the destination holds now is skipped without being sent, the
+        # entries of files deleted from it since are dropped from the index
+        for child in get_children(parentFolderId, logger, max_age=0).values():
+            present.add(child["id"])
+            if child.get("type") == "file" and child.get("md5"):
+                index_.add(child["md5"], child["size"], child["id"], child["name"], parentFolderId)
+        index_.prune(parentFolderId, present)
+
+    def worker(index, file, folderId, md5_future):
+        count = total if total is not None else "?"
+        if not dedupe or isinstance(file, StreamSource):
+            # Bundles and encrypted files differ at each run, they are always sent
+            return (*scheduled_upload(scheduler, index, count, folderId, file, logger), "uploaded")
+        return dedupe_worker(index, count, scheduler, folderId, file, md5_future, (index_, present, claims, claims_lock), logger)
+
+    def hashed():
+        # Hashing runs ahead of the uploads on its own pool, over the whole list
+        # or up to jobs * 4 files of a scan. Only the files that may be duplicates
+        # are read: a known content or another file of the run has their size.
+        # The largest file of that window goes first, so no big upload is left
+        # running alone at the end of the run.
+        nonlocal total
+        window = total if total is not None else jobs * 4
+        ahead = []
+        sizes = {}
+
+        def candidate(file, size):
+            return dedupe and not isinstance(file, StreamSource) and (sizes[size] > 1 or index_.has_size(size))
+
+        def pop():
+            size, index, file, md5_future = heapq.heappop(ahead)
+            # The first file of a size is hashed once another one shows up
+            if md5_future is None and candidate(file, -size):
+                md5_future = hash_executor.submit(index_.hash, file)
+            return index, file, md5_future
+
+        for index, file in enumerate(files):
+            scanned.append(file)
+            size = source_size(file)
+            sizes[size] = sizes.get(size, 0) + 1
+            md5_future = hash_executor.submit(index_.hash, file) if candidate(file, size) else None
+            heapq.heappush(ahead, (-size, index, file, md5_future))
+            if len(ahead) > window:
+                yield pop()
+        total = len(scanned)
+        progress_bar.total = total
+        progress_bar.refresh()
+        while ahead:
+            yield pop()
+
+    hash_executor = ThreadPoolExecutor(max_workers=jobs)
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        with logging_redirect_tqdm(), tqdm(total=total, unit='file', desc='Uploaded', disable=total is not None and total < 2) as progress_bar:
+            iterator = hashed()
+            if not parentFolderId:
+                # Without a destination the first upload creates the folder the others go to
+                for index, file, md5_future in iterator:
+                    results[index] = worker(index, file, parentFolderId, md5_future)
+                    progress_bar.update(1)
+                    if results[index][0]:
+                        parentFolderId = results[index][0][1]
+                        break
+            pending = {}
+            for index, file, md5_future in iterator:
+                if len(pending) >= jobs * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[pending.pop(future)] = future.result()
+                future = executor.submit(worker, index, file, parentFolderId, md5_future)
+                future.add_done_callback(lambda _: progress_bar.update(1))
+                pending[future] = index
+            for future in list(pending):
+                results[pending.pop(future)] = future.result()
+    except KeyboardInterrupt:
+        stop_transfers(executor, hash_executor)
+        raise
+    finally:
+        executor.shutdown()
+        hash_executor.shutdown(cancel_futures=True)
+        if dedupe:
+            index_.close()
+        if parentFolderId:
+            get_cache().invalidate(parentFolderId)
+
+    elapsed_time = time.time() - start_time
+    actions = {"uploaded": [], "copied": [], "skipped": [], "failed": []}
+    for index in sorted(results):
+        actions[results[index][2]].append(index)
+    total_bytes = sum(results[index][1] for index in actions["uploaded"])
+    saved_bytes = sum(results[index][1] for index in actions["copied"] + actions["skipped"])
+    total = len(scanned)
+    logger.info(f"Upload summary: {len(actions['uploaded'])}/{total} files uploaded, {len(actions['failed'])} failed, {file_size(num_bytes=total_bytes)} in {elapsed_time:.2f}s")
+    if len(scheduler.servers) > 1 and actions["uploaded"]:
+        logger.info(f"Servers: {scheduler.summary()}")
+    if saved_bytes or actions["copied"] or actions["skipped"]:
+        logger.info(f"Deduplicated: {len(actions['copied'])} copied server-side, {len(actions['skipped'])} already present, {file_size(num_bytes=saved_bytes)} not sent")
+    for index in actions["failed"]:
+        logger.error(f"Failed: '{scanned[index]}'")
+    return parentFolderId, [scanned[index] for index in actions["failed"]]
+
+
+def upload_manifest(serverName, folderId, name, manifest, logger, key=None):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, name)
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+        if uploadfile(serverName, folderId, EncryptedFile(path, key) if key else path, logger, progress=False):
+            logger.info(f"Bundle manifest uploaded: {name}")
+        else:
+            logger.error(f"Could not upload the bundle manifest {name}")
 
 
-def upload(filePath, folderPath, folderName, parentFolderId, private, logger):
+def schedule_servers(files, logger, api=None, transfers=None):
+    transfers = transfers or get_transfers()
+    selection_start = time.perf_counter()
+    servers = getservers(logger, api=api)
+    if not servers:
+        return None
+    # Probes of the last SERVER_CACHE_TTL seed the scheduler, a client of its own
+    # (api given) leaves the CLI cache alone
+    probes = load_server_cache(servers) if api is None else {}
+    missing = [server for server in servers if server not in probes]
+    if len(servers) > 1 and missing and max([source_size(file) for file in files], default=0) > 100 * 1024 * 1024:  # 100 MB in bytes
+        logger.debug("One of the file have a size > 100 MB. Probing the servers...")
+        probes.update(probe_servers(missing, logger, transfers.server_url))
+        if api is None:
+            save_server_cache(probes)
+    elif probes:
+        logger.debug(f"Using the cached probes of {', '.join(probes)}")
+    logger.debug(f"Scheduling uploads over: {', '.join(servers)}")
+    if transfers.metrics:
+        transfers.metrics.add_phase("server_selection", time.perf_counter() - selection_start)
+    return ServerScheduler(servers, logger, probes)
+
+
+def upload(filePath, folderPath, folderName, parentFolderId, private, logger, jobs=1, dedupe=True, bundle=False, bundle_threshold=BUNDLE_THRESHOLD, bundle_size=BUNDLE_SIZE, key=None, exclude=(), include=()):
     files = []
     logger.info("Starting upload")
     logger.debug("File: %s", filePath)
     if folderPath:
-        files = get_file_paths(folderPath)
-        if not files:
+        files = scan_files(folderPath, exclude=exclude, include=include, logger=logger)
+        # The server is picked from the first entries of the scan, the others
+        # are uploaded as the scan finds them
+        head = list(itertools.islice(files, SCAN_LOOKAHEAD))
+        if not head:
             logger.error("No files found in folder")
             sys.exit()
+        files = itertools.chain(head, files)
+        if bundle:
+            # Grouping the small files needs the whole listing
+            files, bundles, manifest = make_bundles(folderPath, list(files), bundle_threshold, bundle_size)
+            logger.info(f"Bundled {sum(len(b.entries) for b in bundles)} small files into {len(bundles)} archives, {len(files)} files sent as they are")
+            files += bundles
+            head = files
     else:
         if os.path.exists(filePath):
-            files = [filePath]
+            files = head = [LocalFile.of(filePath)]
         else:
             logger.error("File not found")
             sys.exit()
-    
-    # Getting servers
-    servers = getservers(logger)
-    if servers:
-        if len(servers) > 1: # If there are multiple servers, check the size of the files
-            if max([os.path.getsize(file) for file in files]) > 100 * 1024 * 1024:  # 100 MB in bytes
-                logger.debug("One of the file have a size > 100 MB. Fetching best server...")
-                serverName = test_servers(servers, logger)
-            else:
-                serverName = random.choice(servers)
-        else:
-            serverName = servers[0]
-        logger.debug(f"Selected server: {serverName}")
+    if key:
+        files = [EncryptedFile(file, key) for file in files] if isinstance(files, list) else (EncryptedFile(file, key) for file in files)
 
+    # Getting servers
+    scheduler = schedule_servers(head, logger)
+    if scheduler:
         if folderName and parentFolderId:
             logger.info(f"Creating folder: {folderName} for: {parentFolderId}")
             folderId = createfolder(parentFolderId, folderName, logger)
@@ -403,89 +2133,916 @@ def upload(filePath, folderPath, folderName, parentFolderId, private, logger):
             parentFolderId = folderId
             logger.debug(f"FolderId: {parentFolderId}")
 
-        for file in files:
-            if parentFolderId:
-                logger.info(f"Uploading file: '{file}' ({file_size(file)}) to: '{parentFolderId}' on: '{serverName}'")
-            else:
-                logger.info(f"Uploading file: '{file}' ({file_size(file)}) on: '{serverName}'")
-            downloadPage, parentFolderId, speed, elapsed_time = uploadfile(serverName, parentFolderId, file, logger)
-            logger.info(f"File uploaded to: {downloadPage} in {elapsed_time} at {speed}")
+        parentFolderId, failed = upload_files(scheduler, parentFolderId, files, jobs, logger, dedupe=dedupe)
+        if not parentFolderId:
+            logger.error("No file could be uploaded")
+            sys.exit()
+        if bundle and folderPath and manifest[1]["bundles"]:
+            upload_manifest(scheduler.best(), parentFolderId, *manifest, logger, key=key)
 
         if not private:
-            action = actionFolder(parentFolderId, "true", logger)
-            if action:
-                logger.info("Folder made public")
-            else:
-                logger.error(f"{action}")
+            actionFolder(parentFolderId, "true", logger)
+            logger.info("Folder made public")
         else:
-            action = actionFolder(parentFolderId, "false", logger)
-            if action:
-                logger.info("Folder made private")
-            else:
-                logger.error(f"{action}")
+            actionFolder(parentFolderId, "false", logger)
+            logger.info("Folder made private")
         play_sound(logger)
+        return failed
     else:
         time.sleep(10)
         sys.exit()
 
 
-def downloadFile(downloadUrl, path, logger):
-    start_time = time.time()
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    response = requests.get(downloadUrl, headers=headers, stream=True)
-    # response = reqst(downloadUrl, headers=headers, logger=logger, method="get")
-    total_size = int(response.headers.get('content-length', 0))
-    
-    with open(path, "wb") as f, tqdm(total=total_size, unit='B', unit_scale=True, desc='Downloading', leave=False) as progress_bar:
-        for chunk in response.iter_content(1024):
+def probe_range_support(downloadUrl, headers, logger):
+    # Ask for the first byte only: a 206 with a Content-Range tells both that
+    # ranges are supported and the full size of the file.
+    try:
+        with get_session().get(downloadUrl, headers={**headers, "Range": "bytes=0-0"}, stream=True) as response:
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code == 206 and "/" in content_range:
+                total = content_range.rsplit("/", 1)[-1]
+                if total.isdigit():
+                    return int(total)
+    except requests.exceptions.RequestException as e:
+        logger.debug(f"Range probe failed for {downloadUrl}: {e}")
+    return None
+
+
+def load_download_state(state_path):
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_download_state(state_path, state, lock):
+    with lock:
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+
+def write_segment(response, f, segment, progress_bar, progress_lock, save_state, limiters=None, digest=None):
+    # segment is [start, end, next]: next only moves once the bytes before it
+    # are flushed, so the saved state never claims data that is not on disk.
+    position = segment[2]
+    saved = position
+    try:
+        for chunk in throttled(response.iter_content(slice_size(DOWNLOAD_BUFFER, limiters)), limiters):
+            check_stop()
             if chunk:
                 f.write(chunk)
-                progress_bar.update(len(chunk))
+                if digest is not None:
+                    digest.update(position, chunk)
+                position += len(chunk)
+                with progress_lock:
+                    progress_bar.update(len(chunk))
+                if position - saved >= STATE_SAVE_INTERVAL:
+                    f.flush()
+                    segment[2] = saved = position
+                    save_state()
+    finally:
+        f.flush()
+        segment[2] = position
+        save_state()
+
+
+def download_segment(downloadUrl, headers, part_path, segment, progress_bar, progress_lock, save_state, connect_times, limiters=None, digest=None):
+    start, end, position = segment
+    range_headers = {**headers, "Range": f"bytes={position}-{end}"}
+    with get_session().get(downloadUrl, headers=range_headers, stream=True) as response:
+        connect_times.append(response.elapsed.total_seconds())
+        if response.status_code != 206:
+            raise IOError(f"Server answered {response.status_code} to range {position}-{end}")
+        # Each segment has its own handle, so the seek + writes are positional
+        # and never interleave with the other segments.
+        with open(part_path, "r+b") as f:
+            f.seek(position)
+            write_segment(response, f, segment, progress_bar, progress_lock, save_state, limiters, digest)
+    if segment[2] != end + 1:
+        raise IOError(f"Segment {start}-{end} of {part_path} is incomplete")
+
+
+def downloadFile(downloadUrl, path, logger, segments=1, token=None, progress=True, key=None, md5=None, size=None, transfers=None):
+    # Data goes to <path>.part and the finished ranges to <path>.part.json, the
+    # file only gets its final name once complete so an interrupted download
+    # can be resumed with Range requests on the next run. With the md5 GoFile
+    # lists for the file, the data is checked as it is written. A size known
+    # from the listing spares the Range probe of the files too small to split.
+    transfers = transfers or get_transfers()
+    start_time = time.time()
+    transfer_start = time.perf_counter()
+    connect_times = []
+    limiters = transfers.limiters()
+    headers = {"Authorization": f"Bearer {token or TOKEN}"}
+    part_path = path + ".part"
+    state_path = part_path + ".json"
+    state_lock = threading.Lock()
+    progress_lock = threading.Lock()
+    state = load_download_state(state_path) if os.path.exists(part_path) and not key else None
+    digest = StreamDigest() if md5 else None
+    total_size = None
+    if not key and (state or (segments > 1 and (size is None or size >= 2 * MIN_SEGMENT_SIZE))):
+        total_size = probe_range_support(downloadUrl, headers, logger)
+        if total_size is None:
+            logger.debug(f"No range support for {downloadUrl}, using a single stream")
+    probe_time = time.perf_counter() - transfer_start
+    resumed = 0
+    if key:
+        # Chunks are decrypted in order as they come, so an encrypted file is
+        # fetched over a single stream and restarted rather than resumed
+        with get_session().get(downloadUrl, headers=headers, stream=True) as response:
+            connect_times.append(response.elapsed.total_seconds())
+            response.raise_for_status()
+            total_size = int(response.headers.get('content-length', 0))
+
+            def received():
+                # The md5 GoFile has is the one of the encrypted bytes
+                offset = 0
+                for chunk in throttled(response.iter_content(slice_size(DOWNLOAD_BUFFER, limiters)), limiters):
+                    check_stop()
+                    progress_bar.update(len(chunk))
+                    if digest is not None:
+                        digest.update(offset, chunk)
+                    offset += len(chunk)
+                    yield chunk
+
+            with open(part_path, "wb") as f, tqdm(total=total_size, unit='B', unit_scale=True, desc='Decrypting', leave=False, disable=not progress) as progress_bar:
+                try:
+                    for chunk in decrypt_chunks(received(), key):
+                        f.write(chunk)
+                except GoFileError:
+                    f.close()
+                    os.remove(part_path)
+                    raise
+    elif total_size is not None:
+        if state and state.get("size") == total_size:
+            remaining = sum(end + 1 - position for _, end, position in state["segments"] if position <= end)
+            logger.info(f"Resuming {path} at {file_size(num_bytes=total_size - remaining)}/{file_size(num_bytes=total_size)}")
+        else:
+            if state:
+                logger.warning(f"Partial download of {path} does not match the remote size, restarting it")
+            segment_count = max(1, min(segments, total_size // MIN_SEGMENT_SIZE))
+            segment_size = max(1, -(-total_size // segment_count))
+            state = {"url": downloadUrl, "size": total_size, "segments": [[start, min(start + segment_size, total_size) - 1, start] for start in range(0, total_size, segment_size)]}
+            with open(part_path, "wb") as f:
+                f.truncate(total_size)
+            save_download_state(state_path, state, state_lock)
+        todo = [segment for segment in state["segments"] if segment[2] <= segment[1]]
+        done = resumed = total_size - sum(end + 1 - position for _, end, position in todo)
+        logger.debug(f"Downloading {path} in {len(todo)} segments")
+        save_state = lambda: save_download_state(state_path, state, state_lock)
+        with tqdm(initial=done, total=total_size, unit='B', unit_scale=True, desc='Downloading', leave=False, disable=not progress) as progress_bar, ThreadPoolExecutor(max_workers=max(1, len(todo))) as executor:
+            futures = [executor.submit(download_segment, downloadUrl, headers, part_path, segment, progress_bar, progress_lock, save_state, connect_times, limiters, digest) for segment in todo]
+            for future in futures:
+                future.result()
+    else:
+        with get_session().get(downloadUrl, headers=headers, stream=True) as response:
+            connect_times.append(response.elapsed.total_seconds())
+            total_size = int(response.headers.get('content-length', 0))
+            state = {"url": downloadUrl, "size": total_size, "segments": [[0, total_size - 1, 0]]}
+            # Without a known size there is nothing to resume against
+            save_state = (lambda: save_download_state(state_path, state, state_lock)) if total_size else (lambda: None)
+            with open(part_path, "wb") as f, tqdm(total=total_size, unit='B', unit_scale=True, desc='Downloading', leave=False, disable=not progress) as progress_bar:
+                write_segment(response, f, state["segments"][0], progress_bar, progress_lock, save_state, limiters, digest)
+            if total_size and state["segments"][0][2] != total_size:
+                raise IOError(f"Download of {path} is incomplete")
+    if digest is not None:
+        actual = digest.finish(None if key else part_path)
+        if actual != md5:
+            # Dropped with its state, the next attempt starts over
+            os.remove(part_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            raise GoFileChecksumError(f"Checksum mismatch for {path}: md5 {actual}, GoFile has {md5}")
+    os.replace(part_path, path)
+    if os.path.exists(state_path):
+        os.remove(state_path)
     logger.debug(f"File downloaded: {path}")
-    speed, elapsed_time = calculate_upload_speed(path, start_time)
+    total_time = time.perf_counter() - transfer_start
+    connect_time = min(probe_time + min(connect_times, default=0), total_time)
+    if transfers.metrics:
+        server = (urllib.parse.urlsplit(downloadUrl).hostname or "").split(".gofile.io")[0]
+        transfers.metrics.record("download", path, server, total_size - resumed, {"connect": connect_time, "transfer": total_time - connect_time}, segments=max(1, len(connect_times)), resumed_bytes=resumed)
+    speed, elapsed_time = calculate_upload_speed(path, start_time, num_bytes=total_size - resumed)
     return speed, elapsed_time
 
 
-def download(folderId, folderPath, force, logger):
+def safe_name(name):
+    # Remote names become local path components: keep them inside the output folder
+    name = name.replace("/", "_").replace("\\", "_").strip()
+    if name in ("", ".", ".."):
+        name = "_"
+    return name
+
+
+def unique_path(taken, path):
+    # GoFile allows several files with one name in a folder, later ones get a
+    # " (n)" suffix so that no two downloads share a path or a .part file
+    root, ext = os.path.splitext(path)
+    n = 0
+    while os.path.normcase(path) in taken:
+        n += 1
+        path = f"{root} ({n}){ext}"
+    taken.add(os.path.normcase(path))
+    return path
+
+
+def crawl(folderId, width, logger, include_folders=False, api=None, max_age=None, unlisted=None):
+    # Breadth-first walk of the remote tree with `width` listings in flight.
+    # Files are yielded with their path relative to the root folder as soon as
+    # their parent folder is listed, so downloads can start before the walk ends.
+    # A folder that cannot be listed raises, unless an `unlisted` list is given:
+    # its relative path is then added there and the walk goes on without it.
+    with ThreadPoolExecutor(max_workers=max(1, width)) as executor:
+        pending = {executor.submit(get_children, folderId, logger, api, max_age): ""}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                relative_dir = pending.pop(future)
+                try:
+                    children = future.result()
+                except GoFileError as e:
+                    if unlisted is None:
+                        raise
+                    logger.error(f"Could not list folder '{relative_dir or folderId}': {e}")
+                    unlisted.append(relative_dir)
+                    continue
+                # A stable order keeps the " (n)" suffixes of unique_path() the same between runs
+                for child in sorted(children.values(), key=lambda child: (child.get('createTime', 0), child['id'])):
+                    if child['type'] == "file":
+                        yield relative_dir, child
+                    else:
+                        if include_folders:
+                            yield relative_dir, child
+                        sub_dir = os.path.join(relative_dir, safe_name(child['name']))
+                        pending[executor.submit(get_children, child['id'], logger, api, max_age)] = sub_dir
+
+
+def download_worker(index, file, path, force, logger, segments=1, key=None):
+    name = file['name']
+    size = decrypted_size(file['size']) if key else file['size']
+    logger.info(f"Downloading file {index + 1}: {path} ({file_size(num_bytes=size)})")
+    if os.path.exists(path) and not force:
+        local_size = os.path.getsize(path)
+        if local_size == size:
+            logger.warning(f"File {name} already exists skipping (set --force to overwrite)")
+            return "skipped"
+        logger.warning(f"File {name} already exists but is incomplete ({file_size(num_bytes=local_size)}), downloading it again")
+    elif os.path.exists(path) and force:
+        logger.warning(f"File {name} already exists overwriting")
+    try:
+        for attempt in range(2):
+            try:
+                speed, elapsed_time = downloadFile(file['link'], path, logger, segments=segments, key=key, md5=file.get('md5'), size=file['size'])
+                break
+            except GoFileChecksumError as e:
+                if attempt:
+                    raise
+                logger.warning(f"{e}, downloading it again")
+    except GoFileInterrupted:
+        raise
+    except Exception as e:
+        logger.error(f"Download of '{name}' failed: {e}")
+        metrics = get_transfers().metrics
+        if metrics:
+            metrics.record("download", path, (urllib.parse.urlsplit(file['link']).hostname or "").split(".gofile.io")[0], 0, {}, status="failed", error=str(e))
+        return "failed"
+    logger.info(f"File download to: {path} in {elapsed_time} at {speed}")
+    return "downloaded"
+
+
+def unbundle_worker(index, file, folderPath, force, logger, token=None, key=None):
+    # Extracts a bundle while it streams in, nothing but the extracted files touches the disk
+    name = file['name']
+    logger.info(f"Unbundling file {index + 1}: {name} ({file_size(num_bytes=file['size'])}) into {folderPath}")
+    start_time = time.perf_counter()
+    extracted = skipped = 0
+    transfers = get_transfers()
+    try:
+        with get_session().get(file['link'], headers={"Authorization": f"Bearer {token or TOKEN}"}, stream=True) as response, \
+                tqdm(total=file['size'], unit='B', unit_scale=True, desc=name[:20], leave=False) as progress_bar:
+            response.raise_for_status()
+            limiters = transfers.limiters()
+            digest = hashlib.md5()
+
+            def received():
+                for chunk in throttled(response.iter_content(slice_size(DOWNLOAD_BUFFER, limiters)), limiters):
+                    check_stop()
+                    digest.update(chunk)
+                    yield chunk
+
+            chunks = received()
+            source = ChunkReader(decrypt_chunks(chunks, key) if key else chunks)
+            with tarfile.open(fileobj=source, mode="r|") as tar:
+                for member in tar:
+                    progress_bar.update(member.size + tarfile.BLOCKSIZE)
+                    if not member.isfile():
+                        continue
+                    parts = [safe_name(part) for part in member.name.split("/") if part]
+                    path = os.path.join(check_folderPath(os.path.join(folderPath, *parts[:-1])), parts[-1])
+                    if not force and os.path.exists(path) and os.path.getsize(path) == member.size:
+                        skipped += 1
+                        continue
+                    source = tar.extractfile(member)
+                    with open(path + ".part", "wb") as f:
+                        for chunk in read_in_chunks(source, DOWNLOAD_BUFFER):
+                            f.write(chunk)
+                    os.replace(path + ".part", path)
+                    os.utime(path, (member.mtime, member.mtime))
+                    extracted += 1
+            # The tar reader may stop before the end of the stream, the rest still counts in the md5
+            for _ in chunks:
+                pass
+            if file.get('md5') and digest.hexdigest() != file['md5']:
+                raise GoFileChecksumError(f"Checksum mismatch for bundle {name}: md5 {digest.hexdigest()}, GoFile has {file['md5']}")
+    except GoFileInterrupted:
+        raise
+    except (requests.exceptions.RequestException, tarfile.TarError, OSError, GoFileError) as e:
+        logger.error(f"Unbundling of '{name}' failed: {e}")
+        if transfers.metrics:
+            transfers.metrics.record("download", name, (urllib.parse.urlsplit(file['link']).hostname or "").split(".gofile.io")[0], 0, {}, status="failed", error=str(e))
+        return "failed"
+    if transfers.metrics:
+        transfers.metrics.record("download", name, (urllib.parse.urlsplit(file['link']).hostname or "").split(".gofile.io")[0], file['size'], {"transfer": time.perf_counter() - start_time}, extracted=extracted)
+    logger.info(f"Bundle {name}: {extracted} files extracted, {skipped} already present")
+    return "downloaded"
+
+
+def download(folderId, folderPath, force, logger, jobs=1, crawl_jobs=8, segments=1, unbundle=False, key=None):
     if 'https' in folderId:
         folderId = folderId.split('/')[-1]
     if len(folderId) == 36:
-        folderId = get_code(folderId)
-    files = []
+        folderId = get_code(folderId, logger)
     logger.info("Fetching files")
     logger.debug("FolderId: %s", folderId)
-    folderIdList = [folderId]
-    while folderIdList:
-        for folderId in folderIdList:
-            children = get_children(folderId, logger)
-            folderIdList.remove(folderId)
-            for child in children:
-                if children[child]['type'] == "file":
-                    files.append(children[child])
-                else:
-                    folderIdList.append(children[child]['id'])
-    nbdone = 0
-    logger.info(f"Starting download of {len(files)} files")
-    for file in files:
-        logger.info(f"Downloading file {nbdone}/{len(files)}: {file['name']} ({file_size(num_bytes=file['size'])})")
-        downloadUrl = file['link']
-        name = file['name']
-        if folderPath:
-            folderPath = check_folderPath(folderPath)
-        else:
-            folderPath = check_folderPath(os.path.join(os.getcwd(), folderId))
-        path = os.path.join(folderPath, name)
-        if os.path.exists(path) and not force:
-            logger.warning(f"File {name} already exists skipping (set --force to overwrite)")
-        elif os.path.exists(path) and force:
-            logger.warning(f"File {name} already exists overwriting")
-            speed, elapsed_time = downloadFile(downloadUrl, path, logger)
-            logger.info(f"File download to: {path} in {elapsed_time} at {speed}")
+    if not folderPath:
+        folderPath = os.path.join(os.getcwd(), folderId)
+    results = {"downloaded": 0, "skipped": 0, "failed": 0}
+    start_time = time.time()
+    jobs = max(1, jobs)
+    taken = set()
+    unlisted = []
+
+    def tasks():
+        for index, (relative_dir, file) in enumerate(crawl(folderId, crawl_jobs, logger, unlisted=unlisted)):
+            encrypted = bool(key) and file['name'].endswith(ENCRYPTED_SUFFIX)
+            if unbundle and BUNDLE_PATTERN.match(file['name']):
+                yield index, unbundle_worker, index, file, os.path.join(folderPath, relative_dir), force, logger, None, key if encrypted else None
+                continue
+            if unbundle and file['name'].startswith(BUNDLE_PREFIX) and file['name'].endswith((".json", ".json" + ENCRYPTED_SUFFIX)):
+                # The manifest only describes the bundles
+                continue
+            name = file['name'][:-len(ENCRYPTED_SUFFIX)] if encrypted else file['name']
+            path = unique_path(taken, os.path.join(check_folderPath(os.path.join(folderPath, relative_dir)), safe_name(name)))
+            yield index, download_worker, index, file, path, force, logger, segments, key if encrypted else None
+
+    with logging_redirect_tqdm(), ThreadPoolExecutor(max_workers=jobs) as executor:
+        for _, result in run_bounded(executor, jobs, tasks()):
+            results[result] += 1
+    total = sum(results.values())
+    logger.info(f"Download summary: {results['downloaded']}/{total} files downloaded, {results['skipped']} skipped, {results['failed']} failed in {time.time() - start_time:.2f}s")
+    if unlisted:
+        # Counted as failures: the files of those folders were not fetched
+        logger.error(f"{len(unlisted)} folders could not be listed, their files were not downloaded")
+        results["failed"] += len(unlisted)
+    play_sound(logger)
+    return results
+
+
+def verify_file(path, size, md5):
+    # Runs in a worker process of verify()
+    try:
+        if os.path.getsize(path) != size:
+            return "mismatch"
+    except OSError:
+        return "missing"
+    if not md5:
+        return "unchecked"
+    return "ok" if file_md5(path) == md5 else "mismatch"
+
+
+def verify(folderId, folderPath, logger, jobs=1, crawl_jobs=8, segments=1, hash_jobs=None, dry_run=False):
+    # Checks a local copy (downloaded without --unbundle or --decrypt) against
+    # the size and md5 GoFile lists for each file, hashing on a process pool to
+    # use every core, then fetches again only the missing or corrupted files.
+    from concurrent.futures import ProcessPoolExecutor
+    if 'https' in folderId:
+        folderId = folderId.split('/')[-1]
+    if len(folderId) == 36:
+        folderId = get_code(folderId, logger)
+    if not folderPath:
+        folderPath = os.path.join(os.getcwd(), folderId)
+    logger.info(f"Verifying {folderPath} against {folderId}")
+    start_time = time.time()
+    hash_jobs = max(1, hash_jobs or os.cpu_count() or 1)
+    counts = {"ok": 0, "mismatch": 0, "missing": 0, "unchecked": 0}
+    refetch = []
+    taken = set()
+    unlisted = []
+
+    def tasks():
+        for relative_dir, file in crawl(folderId, crawl_jobs, logger, max_age=0, unlisted=unlisted):
+            path = unique_path(taken, os.path.join(folderPath, relative_dir, safe_name(file['name'])))
+            yield (path, file), verify_file, path, file['size'], file.get('md5')
+
+    with ProcessPoolExecutor(max_workers=hash_jobs) as executor:
+        for (path, file), status in run_bounded(executor, hash_jobs, tasks()):
+            counts[status] += 1
+            if status in ("mismatch", "missing"):
+                logger.warning(f"{'Corrupted' if status == 'mismatch' else 'Missing'}: {path}")
+                refetch.append((path, file))
+            else:
+                logger.debug(f"{status}: {path}")
+    logger.info(f"Verify summary: {counts['ok']} ok, {counts['mismatch']} corrupted, {counts['missing']} missing, {counts['unchecked']} without md5 in {time.time() - start_time:.2f}s")
+    counts["failed"] = len(unlisted)
+    if unlisted:
+        logger.error(f"{len(unlisted)} folders could not be listed, their files were not verified")
+    if not refetch or dry_run:
+        return counts
+
+    results = {"downloaded": 0, "skipped": 0, "failed": 0}
+
+    def downloads():
+        for index, (path, file) in enumerate(refetch):
+            check_folderPath(os.path.dirname(path))
+            yield path, download_worker, index, file, path, True, logger, segments
+
+    with logging_redirect_tqdm(), ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for _, result in run_bounded(executor, max(1, jobs), downloads()):
+            results[result] += 1
+    logger.info(f"Refetched {results['downloaded']}/{len(refetch)} files, {results['failed']} failed")
+    counts["refetched"] = results["downloaded"]
+    counts["failed"] += results["failed"]
+    play_sound(logger)
+    return counts
+
+
+def manifest_path(folderId, folderPath):
+    key = hashlib.sha1(os.path.abspath(folderPath).encode()).hexdigest()[:12]
+    return os.path.join(get_cache_dir("manifests"), f"{folderId}-{key}.json")
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}}
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def remote_tree(folderId, crawl_jobs, logger, max_age=None):
+    # Flattens the remote tree into {"dir/name": file} and {"dir": folderId}.
+    # Raises when a folder cannot be listed: a sync acting on part of the tree
+    # would take the files of the missing folders for new ones.
+    files, folders = {}, {"": folderId}
+    for relative_dir, child in crawl(folderId, crawl_jobs, logger, include_folders=True, max_age=max_age):
+        relative_path = os.path.join(relative_dir, safe_name(child['name'])).replace(os.sep, "/")
+        if child['type'] == "file":
+            files[relative_path] = child
         else:
-            speed, elapsed_time = downloadFile(downloadUrl, path, logger)
-            logger.info(f"File download to: {path} in {elapsed_time} at {speed}")
-        nbdone += 1
+            folders[relative_path] = child['id']
+    return files, folders
+
+
+def sync_upload(folderPath, folderId, logger, jobs=1, crawl_jobs=8, exclude=(), include=()):
+    # A file is sent again only when it is missing remotely or its content
+    # changed. Files whose size and mtime match the manifest are not even hashed.
+    if not folderId:
+        logger.error("--sync needs the id of the remote folder to sync with (--parent)")
+        sys.exit()
+    path = manifest_path(folderId, folderPath)
+    manifest = load_manifest(path)
+    logger.info("Listing remote folder")
+    # Listed fresh: what is found decides which remote files get deleted
+    remote_files, remote_folders = remote_tree(folderId, crawl_jobs, logger, max_age=0)
+    files = {}
+    changes = []
+    for file in scan_files(folderPath, exclude=exclude, include=include, logger=logger):
+        relative_path = os.path.relpath(file, folderPath).replace(os.sep, "/")
+        entry = manifest["files"].get(relative_path)
+        remote = remote_files.get(relative_path)
+        if entry and remote and entry["id"] == remote["id"] and entry["size"] == file.size and entry["mtime"] == file.mtime:
+            files[relative_path] = entry
+            continue
+        md5 = file_md5(file)
+        if remote and remote.get("md5") == md5:
+            files[relative_path] = {"size": file.size, "mtime": file.mtime, "md5": md5, "id": remote["id"]}
+            continue
+        changes.append((relative_path, file, md5, remote))
+    logger.info(f"Sync: {len(changes)} new or changed files, {len(files)} unchanged")
+    manifest["files"] = files
+    if not changes:
+        save_manifest(path, manifest)
+        return 0
+
+    def remote_folder(relative_dir):
+        if relative_dir not in remote_folders:
+            parentId = remote_folder(posixpath.dirname(relative_dir))
+            remote_folders[relative_dir] = createfolder(parentId, posixpath.basename(relative_dir), logger)
+        return remote_folders[relative_dir]
+
+    def tasks():
+        for index, change in enumerate(changes):
+            relative_path, file = change[:2]
+            yield change, scheduled_upload, scheduler, index, len(changes), remote_folder(posixpath.dirname(relative_path)), file, logger
+
+    scheduler = schedule_servers([change[1] for change in changes], logger)
+    if not scheduler:
+        sys.exit()
+    superseded, failed = [], 0
+    try:
+        with logging_redirect_tqdm(), ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            for (relative_path, file, md5, remote), (result, size) in run_bounded(executor, max(1, jobs), tasks()):
+                if not result:
+                    failed += 1
+                    continue
+                files[relative_path] = {"size": file.size, "mtime": file.mtime, "md5": md5, "id": result[4]}
+                if remote:
+                    superseded.append(remote["id"])
+    finally:
+        save_manifest(path, manifest)
+        get_cache().invalidate(*remote_folders.values())
+    if superseded:
+        try:
+            deletecontents(superseded, logger)
+            logger.info(f"Removed {len(superseded)} outdated remote files")
+        except GoFileError as e:
+            logger.error(f"Could not remove the outdated remote files: {e}")
+    logger.info(f"Sync summary: {len(changes) - failed}/{len(changes)} files uploaded, {failed} failed")
+    play_sound(logger)
+    return failed
+
+
+def sync_download(folderId, folderPath, logger, jobs=1, crawl_jobs=8, segments=1):
+    # Remote files are fetched only when the local copy is missing or differs
+    # from the remote md5; the manifest avoids rehashing untouched local files.
+    if 'https' in folderId:
+        folderId = folderId.split('/')[-1]
+    if len(folderId) == 36:
+        folderId = get_code(folderId, logger)
+    if not folderPath:
+        folderPath = os.path.join(os.getcwd(), folderId)
+    path = manifest_path(folderId, folderPath)
+    manifest = load_manifest(path)
+    files = {}
+    unchanged = 0
+    results = {"downloaded": 0, "skipped": 0, "failed": 0}
+    taken = set()
+    unlisted = []
+
+    def tasks():
+        nonlocal unchanged
+        for index, (relative_dir, file) in enumerate(crawl(folderId, crawl_jobs, logger, unlisted=unlisted)):
+            local_path = unique_path(taken, os.path.join(check_folderPath(os.path.join(folderPath, relative_dir)), safe_name(file['name'])))
+            relative_path = os.path.relpath(local_path, folderPath).replace(os.sep, "/")
+            if os.path.exists(local_path):
+                stat = os.stat(local_path)
+                entry = manifest["files"].get(relative_path)
+                if entry and entry["id"] == file["id"] and entry["md5"] == file.get("md5") and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                    files[relative_path] = entry
+                    unchanged += 1
+                    continue
+                if stat.st_size == file["size"] and file.get("md5") and file_md5(local_path) == file["md5"]:
+                    files[relative_path] = {"size": stat.st_size, "mtime": stat.st_mtime, "md5": file["md5"], "id": file["id"]}
+                    unchanged += 1
+                    continue
+            yield (relative_path, local_path, file), download_worker, index, file, local_path, True, logger, segments
+
+    try:
+        with logging_redirect_tqdm(), ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            for (relative_path, local_path, file), result in run_bounded(executor, max(1, jobs), tasks()):
+                results[result] += 1
+                if result == "downloaded":
+                    stat = os.stat(local_path)
+                    files[relative_path] = {"size": stat.st_size, "mtime": stat.st_mtime, "md5": file.get("md5"), "id": file["id"]}
+    finally:
+        # The entries below a folder that could not be listed are kept for the next run
+        for relative_dir in unlisted:
+            prefix = relative_dir.replace(os.sep, "/") + "/" if relative_dir else ""
+            files.update((relative_path, entry) for relative_path, entry in manifest["files"].items()
+                         if relative_path.startswith(prefix) and relative_path not in files)
+        manifest["files"] = files
+        save_manifest(path, manifest)
+    results["failed"] += len(unlisted)
+    logger.info(f"Sync summary: {results['downloaded']} files downloaded, {unchanged} unchanged, {results['failed']} failed")
+    if unlisted:
+        logger.error(f"{len(unlisted)} folders could not be listed, their files were not synced")
     play_sound(logger)
+    return results
+
+
+class JobQueue:
+    """
+    File-backed (SQLite) queue of uploads and downloads, filled by --enqueue
+    and run by --daemon. Jobs survive restarts: the ones a dead daemon left
+    running are queued again when the next one starts.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir(), "jobs.sqlite")
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, params TEXT, status TEXT, "
+                            "attempts INTEGER DEFAULT 0, error TEXT, created REAL, updated REAL, next_try REAL)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS daemon (id INTEGER PRIMARY KEY CHECK (id = 0), pid INTEGER, heartbeat REAL)")
+
+    def put(self, kind, params):
+        now = time.time()
+        with self.lock:
+            return self.db.execute("INSERT INTO jobs (kind, params, status, created, updated, next_try) VALUES (?, ?, 'queued', ?, ?, ?)",
+                                   (kind, json.dumps(params), now, now, now)).lastrowid
+
+    def acquire(self, pid, timeout):
+        # Only one daemon runs a queue, the other ones see its heartbeat
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            row = self.db.execute("SELECT pid, heartbeat FROM daemon").fetchone()
+            if row and row[0] != pid and time.time() - row[1] < timeout:
+                self.db.execute("ROLLBACK")
+                return False
+            self.db.execute("INSERT OR REPLACE INTO daemon VALUES (0, ?, ?)", (pid, time.time()))
+            self.db.execute("COMMIT")
+            return True
+
+    def heartbeat(self, pid):
+        with self.lock:
+            self.db.execute("UPDATE daemon SET heartbeat = ? WHERE pid = ?", (time.time(), pid))
+
+    def release(self, pid):
+        with self.lock:
+            self.db.execute("DELETE FROM daemon WHERE pid = ?", (pid,))
+
+    def recover(self):
+        with self.lock:
+            return self.db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+
+    def claim(self):
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            row = self.db.execute("SELECT id, kind, params, attempts FROM jobs WHERE status = 'queued' AND next_try <= ? ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row:
+                self.db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, updated = ? WHERE id = ?", (now, row[0]))
+            self.db.execute("COMMIT")
+        if row is None:
+            return None
+        return {"id": row[0], "kind": row[1], "params": json.loads(row[2]), "attempts": row[3] + 1}
+
+    def update_params(self, jobId, params):
+        with self.lock:
+            self.db.execute("UPDATE jobs SET params = ?, updated = ? WHERE id = ?", (json.dumps(params), time.time(), jobId))
+
+    def finish(self, job, error=None):
+        now = time.time()
+        if error is None:
+            status, next_try = "done", now
+        elif job["attempts"] >= DAEMON_MAX_ATTEMPTS:
+            status, next_try = "failed", now
+        else:
+            status, next_try = "queued", now + DAEMON_RETRY_DELAY * 2 ** (job["attempts"] - 1)
+        with self.lock:
+            self.db.execute("UPDATE jobs SET status = ?, error = ?, updated = ?, next_try = ? WHERE id = ?", (status, error, now, next_try, job["id"]))
+        return status
+
+    def jobs(self, limit=50):
+        with self.lock:
+            rows = self.db.execute("SELECT id, kind, params, status, attempts, error, updated FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [{"id": row[0], "kind": row[1], "params": json.loads(row[2]), "status": row[3], "attempts": row[4], "error": row[5], "updated": row[6]} for row in reversed(rows)]
+
+
+def job_params(args):
+    # Paths are made absolute, the daemon does not run from the caller's directory.
+    # Like the command line, a --sync with --folder is an upload.
+    if args.download and not (args.sync and args.folder):
+        return "download", {"download": args.download, "output": os.path.abspath(args.output or os.path.join(os.getcwd(), args.download.rstrip("/").split("/")[-1])),
+                            "force": args.force, "jobs": args.jobs, "crawl_jobs": args.crawl_jobs, "segments": args.segments,
+                            "unbundle": args.unbundle, "decrypt": args.decrypt, "sync": args.sync}
+    return "upload", {"file": args.file and os.path.abspath(args.file), "folder": args.folder and os.path.abspath(args.folder),
+                      "name": args.name, "parent": args.parent, "private": args.private, "jobs": args.jobs, "crawl_jobs": args.crawl_jobs,
+                      "dedupe": not args.no_dedupe, "bundle": args.bundle, "bundle_threshold": args.bundle_threshold,
+                      "bundle_size": args.bundle_size, "encrypt": args.encrypt, "exclude": args.exclude, "include": args.include, "sync": args.sync}
+
+
+def enqueue(args, logger, queue=None):
+    queue = queue or JobQueue()
+    kind, params = job_params(args)
+    jobId = queue.put(kind, params)
+    logger.info(f"Job {jobId} queued: {'sync ' if params['sync'] else ''}{kind} of {params.get('download') or params.get('file') or params.get('folder')}")
+    return jobId
+
+
+def show_queue(logger, queue=None):
+    for job in (queue or JobQueue()).jobs():
+        params = job["params"]
+        target = params.get("download") or params.get("file") or params.get("folder")
+        error = f" ({job['error']})" if job["error"] else ""
+        logger.info(f"Job {job['id']}: {job['kind']} {target} {job['status']}, {job['attempts']} attempts{error}")
+
+
+def run_job(job, queue, logger):
+    # Returns None when the job succeeded, the reason of the failure otherwise
+    params = job["params"]
+    try:
+        key = None
+        if params.get("encrypt") or params.get("decrypt"):
+            if not os.getenv("GOPLOAD_ENCRYPTION_KEY"):
+                return "GOPLOAD_ENCRYPTION_KEY is not set for the daemon"
+            key = encryption_key(os.getenv("GOPLOAD_ENCRYPTION_KEY"))
+        if params.get("sync") and job["kind"] == "upload":
+            failed = sync_upload(params["folder"], params["parent"], logger, jobs=params["jobs"], crawl_jobs=params["crawl_jobs"],
+                                 exclude=params["exclude"], include=params["include"])
+            return f"{failed} files failed" if failed else None
+        if params.get("sync"):
+            results = sync_download(params["download"], params["output"], logger, jobs=params["jobs"], crawl_jobs=params["crawl_jobs"], segments=params["segments"])
+            return f"{results['failed']} files failed" if results["failed"] else None
+        if job["kind"] == "upload":
+            if params["name"] or not params["parent"]:
+                # Created once and saved with the job, so a retry goes on in the same folder
+                params["parent"] = createfolder(params["parent"] or PRIVATE_PARENT_ID, params["name"], logger)
+                params["name"] = None
+                queue.update_params(job["id"], params)
+            failed = upload(params["file"], params["folder"], None, params["parent"], params["private"], logger, jobs=params["jobs"],
+                            dedupe=params["dedupe"], bundle=params["bundle"], bundle_threshold=params["bundle_threshold"],
+                            bundle_size=params["bundle_size"], key=key, exclude=params.get("exclude", []), include=params.get("include", []))
+            return f"{len(failed)} files failed" if failed else None
+        results = download(params["download"], params["output"], params["force"], logger, jobs=params["jobs"], crawl_jobs=params["crawl_jobs"],
+                           segments=params["segments"], unbundle=params["unbundle"], key=key)
+        return f"{results['failed']} files failed" if results["failed"] else None
+    except SystemExit:
+        return "aborted"
+    except Exception as e:
+        logger.debug(f"Job {job['id']} failed", exc_info=True)
+        return f"{e}"
+
+
+def run_daemon(logger, workers=2, poll=DAEMON_POLL_INTERVAL, queue=None):
+    # One long lived process for many jobs: the API client, the connection
+    # pool, the metadata cache and the server choice stay warm between them.
+    queue = queue or JobQueue()
+    pid = os.getpid()
+    if not queue.acquire(pid, 10 * poll):
+        logger.error(f"Another daemon is already running the queue {queue.path}")
+        sys.exit(1)
+    recovered = queue.recover()
+    if recovered:
+        logger.info(f"{recovered} interrupted jobs queued again")
+    logger.info(f"Daemon running {workers} jobs at a time from {queue.path}")
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # Service managers stop it with SIGTERM
+    signal.signal(signal.SIGTERM, stop)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+    active = {}
+    try:
+        while True:
+            queue.heartbeat(pid)
+            while len(active) < workers:
+                job = queue.claim()
+                if job is None:
+                    break
+                logger.info(f"Job {job['id']} started: {job['kind']} (attempt {job['attempts']}/{DAEMON_MAX_ATTEMPTS})")
+                active[executor.submit(run_job, job, queue, logger)] = job
+            if not active:
+                time.sleep(poll)
+                continue
+            done, _ = wait(active, timeout=poll, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = active.pop(future)
+                error = future.result()
+                status = queue.finish(job, error)
+                if error:
+                    logger.error(f"Job {job['id']} failed: {error}, {'retried later' if status == 'queued' else 'giving up'}")
+                else:
+                    logger.info(f"Job {job['id']} done")
+    except KeyboardInterrupt:
+        # Running jobs give up at their next chunk: they are queued again and
+        # their partial downloads and already uploaded files are picked up next time
+        stop_transfers(executor)
+        logger.info(f"Daemon stopped, {len(active)} running jobs queued again")
+        queue.recover()
+        queue.release(pid)
+        raise
+
+
+class GoFileClient:
+    """
+    asyncio interface to GoFile for embedding in other programs, with explicit
+    credentials instead of the CLI globals:
+
+        async with GoFileClient(token, account_id=...) as client:
+            folder = await client.create_folder(await client.get_root_folder(), "backups")
+            await asyncio.gather(*(client.upload_file(path, folder["id"]) for path in paths))
+
+    Calls run on a pool of `concurrency` threads over the pooled requests session
+    and share one ApiClient, so its rate governor applies to every call. The
+    endpoints, bandwidth limits (bytes per second, 0 for none) and metrics are
+    the client's own and passed down to every transfer.
+    """
+
+    def __init__(self, token, account_id=None, concurrency=8, timeout=30, retries=5, rate=5.0, segments=1, logger=None,
+                 api_url=DEFAULT_API_URL, server_url=DEFAULT_SERVER_URL, limit_rate=0, limit_rate_per_transfer=0, metrics=None):
+        self.token = token
+        self.account_id = account_id
+        self.segments = segments
+        self.logger = logger or logging.getLogger(__name__)
+        self.api = ApiClient(token=token, timeout=timeout, retries=retries, rate=rate, logger=self.logger, api_url=api_url)
+        self.transfers = TransferSettings(server_url, BandwidthLimiter(limit_rate) if limit_rate else None, limit_rate_per_transfer, metrics, self.api)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        self.scheduler = None
+        self.scheduler_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
+
+    async def get_servers(self):
+        return await self.run(self.api.servers)
+
+    async def get_account(self, account_id=None):
+        return await self.run(self.api.account, account_id or self.account_id)
+
+    async def get_root_folder(self):
+        return (await self.get_account())["rootFolder"]
+
+    async def get_contents(self, contentId):
+        return await self.run(self.api.contents, contentId)
+
+    async def create_folder(self, parentFolderId, folderName=None):
+        return await self.run(self.api.create_folder, parentFolderId, folderName)
+
+    async def update(self, contentId, attribute, attributeValue):
+        return await self.run(self.api.update, contentId, attribute, attributeValue)
+
+    async def delete(self, contentsIds):
+        return await self.run(self.api.delete_contents, list(contentsIds))
+
+    async def upload_file(self, filePath, folderId=None, server=None):
+        if server:
+            result = await self.run(uploadfile, server, folderId, filePath, self.logger, token=self.token, progress=False, transfers=self.transfers)
+        else:
+            # Concurrent uploads of one client share its scheduler
+            async with self.scheduler_lock:
+                if self.scheduler is None:
+                    scheduler = await self.run(schedule_servers, [LocalFile.of(filePath)], self.logger, api=self.api, transfers=self.transfers)
+                    if not scheduler:
+                        raise GoFileError("No upload server available")
+                    self.scheduler = scheduler
+            size = os.path.getsize(filePath)
+            server = self.scheduler.acquire(size)
+            start_time = time.perf_counter()
+            result = None
+            try:
+                result = await self.run(uploadfile, server, folderId, filePath, self.logger, token=self.token, progress=False, transfers=self.transfers)
+            finally:
+                self.scheduler.release(server, size, time.perf_counter() - start_time, bool(result))
+        if not result:
+            raise GoFileError(f"Upload of '{filePath}' failed")
+        downloadPage, parentFolderId, speed, elapsed_time, fileId, md5 = result
+        return {"id": fileId, "md5": md5, "downloadPage": downloadPage, "parentFolder": parentFolderId, "server": server}
+
+    async def download_file(self, downloadUrl, path, segments=None, size=None):
+        await self.run(downloadFile, downloadUrl, path, self.logger, segments=segments or self.segments, token=self.token, progress=False, size=size, transfers=self.transfers)
+        return path
+
+    async def walk(self, folderId, width=8):
+        # Async iterator over (relative_dir, file) of a remote tree
+        queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        def produce():
+            try:
+                for item in crawl(folderId, width, self.logger, api=self.api):
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        producer = loop.run_in_executor(None, produce)
+        while (item := await queue.get()) is not None:
+            yield item
+        await producer
 
 
 def opt():
@@ -501,12 +3058,49 @@ def opt():
     parser.add_argument("--log-level",type=str,choices=["DEBUG", "ERROR", "INFO", "OFF", "WARN"],default="INFO",help="Set log level [default: INFO]",)
     parser.add_argument("--token", "-tk", type=str, help="GoFile API token")
     parser.add_argument("--private-parent-id", "-pp", type=str, help="GoFile private parent id")
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout in seconds of GoFile API requests [default: 30]")
+    parser.add_argument("--retries", type=int, default=5, help="Retries of failed GoFile API requests [default: 5]")
+    parser.add_argument("--api-rate", type=float, default=5.0, help="Initial GoFile API request rate in req/s, adapted on rate limits [default: 5]")
+    parser.add_argument("--jobs", "-j", type=int, default=4, help="Number of files uploaded or downloaded in parallel [default: 4]")
     
     exclusive_group.add_argument('--stats', "-s",  action='store_true', help='Display account stats.')
     
     exclusive_group.add_argument("--download", "-d", type=str, help="Id or code to the folder to be downloaded")
     parser.add_argument("--output", "-o", type=str, help="¨Path to the folder to be downloaded")
     parser.add_argument("--force", "-fo", action="store_true", help="Overwrite existing files")
+    parser.add_argument("--segments", "-sg", type=int, default=1, help="Number of parallel ranged connections per downloaded file [default: 1]")
+    parser.add_argument("--sync", "-sy", action="store_true", help="Only transfer new or changed files of --folder or --download, tracked in a local manifest")
+    parser.add_argument("--crawl-jobs", "-cj", type=int, default=8, help="Number of remote folders listed in parallel when downloading [default: 8]")
+    parser.add_argument("--bundle", "-b", action="store_true", help="Upload the small files of --folder packed into tar archives")
+    parser.add_argument("--bundle-threshold", type=int, default=BUNDLE_THRESHOLD, help=f"Size in bytes under which a file is bundled [default: {BUNDLE_THRESHOLD}]")
+    parser.add_argument("--bundle-size", type=int, default=BUNDLE_SIZE, help=f"Target size in bytes of a bundle [default: {BUNDLE_SIZE}]")
+    parser.add_argument("--unbundle", "-ub", action="store_true", help="Extract the bundles made by --bundle while downloading them")
+    parser.add_argument("--encrypt", "-e", action="store_true", help="Encrypt the files before they leave the machine (passphrase from GOPLOAD_ENCRYPTION_KEY or prompted)")
+    parser.add_argument("--decrypt", "-de", action="store_true", help="Decrypt the downloaded files uploaded with --encrypt")
+    parser.add_argument("--exclude", "-x", action="append", default=[], help=f"Glob of the files or folders of --folder not to upload, with the {IGNORE_FILE} syntax (e.g. '*.tmp', 'build/'), repeatable")
+    parser.add_argument("--include", action="append", default=[], help="Glob of the files of --folder to upload, the others being skipped (e.g. '*.mkv'), repeatable")
+    parser.add_argument("--no-dedupe", "-nd", action="store_true", help="Upload every file, even when the same content is already on GoFile")
+    parser.add_argument("--cache-ttl", type=float, default=METADATA_CACHE_TTL, help=f"Seconds a cached folder listing or account stats are reused, 0 to refresh them [default: {METADATA_CACHE_TTL}]")
+    parser.add_argument("--limit-rate", type=parse_size, default=0, help="Cap the total bandwidth of all the transfers, e.g. 50M (bytes per second)")
+    parser.add_argument("--limit-rate-per-transfer", type=parse_size, default=0, help="Cap the bandwidth of each transferred file, e.g. 10M")
+    parser.add_argument("--limit-schedule", type=parse_schedule, help="Total bandwidth by time of day, --limit-rate applying outside of the windows, e.g. 08:00-19:00=10M,19:00-08:00=0 (0: unlimited)")
+    parser.add_argument("--enqueue", "-q", action="store_true", help="Queue the upload or download for the daemon instead of running it")
+    exclusive_group.add_argument("--daemon", action="store_true", help="Run the queued jobs, waiting for new ones")
+    exclusive_group.add_argument("--queue", action="store_true", help="List the queued, running and finished jobs")
+    parser.add_argument("--daemon-jobs", type=int, default=2, help="Number of jobs the daemon runs at a time [default: 2]")
+    parser.add_argument("--report", type=str, help="Write a JSON report of the transfers of the run to this file")
+    parser.add_argument("--metrics-jsonl", type=str, help="Append one JSON line per transferred file to this file")
+    parser.add_argument("--prometheus", type=str, help="Write the metrics of the run in Prometheus textfile format to this file")
+    parser.add_argument("--no-sound", action="store_true", help="Do not play a sound when a transfer ends")
+    exclusive_group.add_argument("--bulk", choices=BULK_ACTIONS, help="Publish, unpublish, delete, move, rename or set an attribute of every content given by --ids or --match")
+    parser.add_argument("--ids", type=str, help="Comma separated content ids for --bulk")
+    parser.add_argument("--match", action="append", default=[], help="Glob matched against the paths below --parent (default: the root folder) for --bulk, e.g. 'releases/v1.*' or 'releases/**/*.zip', repeatable")
+    parser.add_argument("--to", type=str, help="Destination folder id of --bulk move, new name of --bulk rename ({name} is the current name)")
+    parser.add_argument("--set", dest="attribute", type=parse_attribute, help="ATTRIBUTE=VALUE of --bulk set, e.g. description=old or expiry=1735689600")
+    parser.add_argument("--dry-run", action="store_true", help="List what --bulk would change, or what --verify would fetch again, without changing it")
+    exclusive_group.add_argument("--verify", type=str, help="Id or code of the remote folder to check the local copy in --output against, fetching again only the missing or corrupted files")
+    parser.add_argument("--hash-jobs", type=int, help="Processes hashing local files for --verify [default: one per core]")
+    exclusive_group.add_argument("--profile-startup", action="store_true", help=f"Measure the cold start time and the imports of the CLI against its budget of {STARTUP_BUDGET * 1000:.0f} ms")
 
     return parser.parse_args()
 
@@ -517,8 +3111,40 @@ def init():
     logging.basicConfig(level=getattr(logging, args.log_level.upper()),format=log_format,datefmt="%H:%M:%S",)
     logger = logging.getLogger(__name__)
 
+    # Checked before anything else, a bad invocation does no work
+    if len(sys.argv) == 1:
+        logger.error("No arguments specified. Use -h for help")
+        sys.exit("")
+
+    global SOUND
+    SOUND = not args.no_sound
+
+    if args.profile_startup:
+        sys.exit(0 if profile_startup(logger) else 1)
+
+    if args.verify and (args.decrypt or args.unbundle):
+        logger.error("--verify checks the files as stored on GoFile, without --decrypt or --unbundle")
+        sys.exit()
+
+    if args.bulk:
+        if not args.ids and not args.match:
+            logger.error("--bulk needs --ids or --match")
+            sys.exit()
+        if args.bulk in ("move", "rename") and not args.to:
+            logger.error(f"--bulk {args.bulk} needs --to")
+            sys.exit()
+        if args.bulk == "set" and not args.attribute:
+            logger.error("--bulk set needs --set ATTRIBUTE=VALUE")
+            sys.exit()
+
+    from dotenv import load_dotenv
     load_dotenv()
 
+    global API_URL
+    global SERVER_URL
+    API_URL = os.getenv("GOFILE_API_URL", API_URL)
+    SERVER_URL = os.getenv("GOFILE_SERVER_URL", SERVER_URL)
+
     global TOKEN
     global PRIVATE_PARENT_ID
     global ACCOUNT_ID
@@ -534,58 +3160,129 @@ def init():
             logger.error("Error: GOPLOAD_TOKEN not found, add GOPLOAD_TOKEN to your environment variables")
             sys.exit()
 
-    if not PRIVATE_PARENT_ID:
-        if args.private_parent_id:
-            PRIVATE_PARENT_ID = args.private_parent_id
-            # set_key(key_to_set='GOPLOAD_PRIVATE_PARENT_ID', value_to_set=args.private_parent_id)
-            set_env_var("GOPLOAD_PRIVATE_PARENT_ID", args.private_parent_id)
-        elif TOKEN:
-            PRIVATE_PARENT_ID = get_rootfolder(logger)
-            # set_key(key_to_set='GOPLOAD_PRIVATE_PARENT_ID', value_to_set=args.private_parent_id)
-            set_env_var("GOPLOAD_PRIVATE_PARENT_ID", args.private_parent_id)
-        else:
+    global API
+    global CACHE_TTL
+    API = ApiClient(token=TOKEN, timeout=args.timeout, retries=args.retries, rate=args.api_rate, logger=logger, api_url=API_URL)
+    CACHE_TTL = args.cache_ttl
+
+    # Only the daemon, and uploads or --match without --parent, need the root
+    # folder, the other commands skip the account call
+    needs_parent = args.daemon or ((args.file or args.folder) and not args.parent and not args.enqueue and not args.sync) or (args.match and not args.parent)
+    if not PRIVATE_PARENT_ID and args.private_parent_id:
+        PRIVATE_PARENT_ID = args.private_parent_id
+        # set_key(key_to_set='GOPLOAD_PRIVATE_PARENT_ID', value_to_set=args.private_parent_id)
+        set_env_var("GOPLOAD_PRIVATE_PARENT_ID", args.private_parent_id)
+    elif not PRIVATE_PARENT_ID and needs_parent:
+        PRIVATE_PARENT_ID = get_rootfolder(logger)
+        if not PRIVATE_PARENT_ID:
             logger.error("Error: GOPLOAD_PRIVATE_PARENT_ID not found, add GOPLOAD_PRIVATE_PARENT_ID to your environment variables")
             sys.exit()
+        set_env_var("GOPLOAD_PRIVATE_PARENT_ID", PRIVATE_PARENT_ID)
 
-    # No params:
-    if len(sys.argv) == 1:
-        logger.error("No arguments specified. Use -h for help")
-        sys.exit("")
-        
-    # Stats section
-    if args.stats:
-        if len(sys.argv) == 2:
-            get_stats(logger)
+    key = None
+    if (args.encrypt or args.decrypt) and not args.enqueue:
+        passphrase = os.getenv("GOPLOAD_ENCRYPTION_KEY") or getpass.getpass("Encryption passphrase: ")
+        if not passphrase:
+            logger.error("Error: an encryption passphrase is needed, set GOPLOAD_ENCRYPTION_KEY")
             sys.exit()
-        else:
-            logger.error("Use --stats without any other argument")
+        key = encryption_key(passphrase)
+
+    global LIMITER
+    global TRANSFER_RATE
+    if args.limit_rate or args.limit_schedule:
+        LIMITER = BandwidthLimiter(args.limit_rate, schedule=args.limit_schedule)
+    TRANSFER_RATE = args.limit_rate_per_transfer
+
+    global METRICS
+    # Only --report lists the transfers, --prometheus and --metrics-jsonl need the running totals alone
+    if not args.report:
+        max_records = 0
+    else:
+        max_records = DAEMON_METRICS_RECORDS if args.daemon else None
+    METRICS = TransferMetrics(jsonl_path=args.metrics_jsonl, max_records=max_records)
+    try:
+        # Daemon section
+        if args.daemon:
+            run_daemon(logger, workers=max(1, args.daemon_jobs))
+        elif args.queue:
+            show_queue(logger)
+        elif args.enqueue:
+            if args.sync and key:
+                logger.error("--encrypt and --decrypt do not work with --sync")
+            elif args.sync and not (args.folder or args.download):
+                logger.error("--sync works with --folder or --download")
+            elif args.sync and args.folder and not args.parent:
+                logger.error("--sync needs the id of the remote folder to sync with (--parent)")
+            elif args.file or args.folder or args.download:
+                enqueue(args, logger)
+            else:
+                logger.error("--enqueue works with --file, --folder or --download")
+
+        # Bulk section
+        elif args.bulk:
+            ids = [contentId.strip() for contentId in (args.ids or "").split(",") if contentId.strip()]
+            targets = resolve_targets(ids, args.match, args.parent or PRIVATE_PARENT_ID, args.bulk, args.crawl_jobs, logger)
+            bulk(args.bulk, targets, logger, jobs=args.jobs, to=args.to, attribute=args.attribute, dry_run=args.dry_run)
+
+        # Verify section
+        elif args.verify:
+            verify(args.verify, args.output, logger, jobs=args.jobs, crawl_jobs=args.crawl_jobs, segments=args.segments, hash_jobs=args.hash_jobs, dry_run=args.dry_run)
+
+        # Stats section
+        elif args.stats:
+            if all(arg.split("=")[0] in STATS_OPTIONS for arg in sys.argv[1:] if arg.startswith("-")):
+                get_stats(logger)
+                sys.exit()
+            else:
+                logger.error(f"Use --stats with no other argument than {', '.join(option for option in STATS_OPTIONS[2:] if option.startswith('--'))}")
+
+        # Sync section
+        elif args.sync:
+            if key:
+                logger.error("--encrypt and --decrypt do not work with --sync")
+            elif args.folder:
+                sync_upload(args.folder, args.parent, logger, jobs=args.jobs, crawl_jobs=args.crawl_jobs, exclude=args.exclude, include=args.include)
+            elif args.download:
+                sync_download(args.download, args.output, logger, jobs=args.jobs, crawl_jobs=args.crawl_jobs, segments=args.segments)
+            else:
+                logger.error("--sync works with --folder or --download")
 
-    # Upload section
-    elif args.file:
-        if args.folder:
-            logger.error("Both file and folder specified")
-            sys.exit()
-        else:
-            upload(args.file, args.folder, args.name, args.parent, args.private, logger)
-    elif args.folder:
-        if args.file:
-            logger.error("Both file and folder specified")
-            sys.exit()
-        else:
-            upload(args.file, args.folder, args.name, args.parent, args.private, logger)
+        # Upload section
+        elif args.file:
+            if args.folder:
+                logger.error("Both file and folder specified")
+                sys.exit()
+            else:
+                upload(args.file, args.folder, args.name, args.parent, args.private, logger, jobs=args.jobs, dedupe=not args.no_dedupe, bundle=args.bundle, bundle_threshold=args.bundle_threshold, bundle_size=args.bundle_size, key=key, exclude=args.exclude, include=args.include)
+        elif args.folder:
+            if args.file:
+                logger.error("Both file and folder specified")
+                sys.exit()
+            else:
+                upload(args.file, args.folder, args.name, args.parent, args.private, logger, jobs=args.jobs, dedupe=not args.no_dedupe, bundle=args.bundle, bundle_threshold=args.bundle_threshold, bundle_size=args.bundle_size, key=key, exclude=args.exclude, include=args.include)
+
+        elif args.name:
+            if not args.parent:
+                logger.warning("Parent folder id not specified, GOPLOAD_PRIVATE_PARENT_ID will be used")
 
-    elif args.name:
-        if not args.parent:
-            logger.warning("Parent folder id not specified, GOPLOAD_PRIVATE_PARENT_ID will be used")
+        # Download section
+        elif args.download:
+            download(args.download, args.output, args.force, logger, jobs=args.jobs, crawl_jobs=args.crawl_jobs, segments=args.segments, unbundle=args.unbundle, key=key)
 
-    # Download section
-    elif args.download:
-        download(args.download, args.output, args.force, logger)
+    finally:
+        METRICS.close()
+        if args.report:
+            METRICS.write_report(args.report)
+        if args.prometheus:
+            METRICS.write_prometheus(args.prometheus)
 
 
 if __name__ == "__main__":
     try:
         init()
+    except GoFileError as e:
+        logging.getLogger(__name__).error(f"{e}")
+        sys.exit(1)
     except KeyboardInterrupt:
         print("\nExiting...")
-        sys.exit()
\ No newline at end of file
+        sys.exit(130)
\ No newline at end of file
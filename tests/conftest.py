@@ -0,0 +1,121 @@
+"""
+Fixtures running the gofilecli command line against benchmarks/mock_server.py,
+no network or GoFile account needed.
+"""
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+import requests
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The unit tests import gofilecli from the root of the repository
+sys.path.insert(0, ROOT_DIR)
+
+
+class Remote:
+    """
+    Direct access to the mock server, to look at what the CLI left there.
+    """
+
+    def __init__(self, url, account, root):
+        self.url = url
+        self.account = account
+        self.root = root
+
+    def request(self, method, path, **kwargs):
+        response = requests.request(method, f"{self.url}/{path}", headers={"Authorization": "Bearer token"}, timeout=30, **kwargs)
+        response.raise_for_status()
+        return response.json()["data"]
+
+    def children(self, folderId):
+        return list(self.request("GET", f"contents/{folderId}")["children"].values())
+
+    def folder(self, name, parentFolderId=None):
+        # The last folder created with that name
+        folders = [child for child in self.children(parentFolderId or self.root) if child["type"] == "folder" and child["name"] == name]
+        assert folders, f"No remote folder named {name}"
+        return folders[-1]
+
+    def delete(self, contentId):
+        return self.request("DELETE", "contents", json={"contentsId": contentId})
+
+    def create_folder(self, name, parentFolderId=None):
+        return self.request("POST", "contents/createFolder", json={"parentFolderId": parentFolderId or self.root, "folderName": name})
+
+    def unlist(self, folderId, unlisted=True):
+        # Makes the listing of the folder fail until called again with unlisted=False
+        return self.request("POST", "_mock/unlist", json={"contentId": folderId, "unlisted": unlisted})
+
+    def download(self, file):
+        response = requests.get(file["link"], timeout=30)
+        response.raise_for_status()
+        return response.content
+
+
+@pytest.fixture(scope="session")
+def remote(tmp_path_factory):
+    storage = tmp_path_factory.mktemp("storage")
+    command = [sys.executable, os.path.join(ROOT_DIR, "benchmarks", "mock_server.py"), "--port", "0", "--storage", str(storage)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Listening on "):
+        process.kill()
+        pytest.fail(f"Mock server did not start: {line}")
+    # Listening on http://127.0.0.1:PORT (account ACCOUNT, root folder ROOT)
+    url = line.split()[2]
+    account = line.split("(account ", 1)[1].split(",", 1)[0]
+    root = line.split("root folder ", 1)[1].strip().rstrip(")")
+    try:
+        yield Remote(url, account, root)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture
+def cli(remote, tmp_path):
+    # Each test gets an empty cache (servers, hashes, metadata, sync manifests)
+    cache = tmp_path / "cache"
+    env = {**os.environ, "GOFILE_API_URL": remote.url, "GOFILE_SERVER_URL": remote.url + "/{server}",
+           "GOPLOAD_TOKEN": "token", "GOPLOAD_ACCOUNT_ID": remote.account, "GOPLOAD_PRIVATE_PARENT_ID": remote.root,
+           "GOPLOAD_ENCRYPTION_KEY": "correct horse battery staple", "XDG_CACHE_HOME": str(cache), "LOCALAPPDATA": str(cache)}
+
+    def run(*args, returncode=0):
+        command = [sys.executable, os.path.join(ROOT_DIR, "gofilecli.py"), *args, "--no-sound"]
+        process = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace", env=env, cwd=tmp_path, timeout=300)
+        assert process.returncode == returncode, process.stderr
+        return process.stderr
+
+    def start(*args):
+        # For the commands that run until stopped, like --daemon
+        command = [sys.executable, os.path.join(ROOT_DIR, "gofilecli.py"), *args, "--no-sound"]
+        return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, cwd=tmp_path)
+
+    run.start = start
+    return run
+
+
+@pytest.fixture
+def name():
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def write_tree(folder, files):
+    for relative_path, data in files.items():
+        path = os.path.join(folder, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def read_tree(folder):
+    files = {}
+    for directory, _, names in os.walk(folder):
+        for file_name in names:
+            path = os.path.join(directory, file_name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, folder).replace(os.sep, "/")] = f.read()
+    return files
@@ -0,0 +1,41 @@
+"""
+Bulk operations when GoFile stops answering part way.
+"""
+import logging
+
+import gofilecli
+
+
+class FlakyApi:
+    # Deletes the first batch, then fails as the network would after the retries
+
+    def __init__(self):
+        self.calls = 0
+
+    def delete_contents(self, contentsIds):
+        self.calls += 1
+        if self.calls > 1:
+            raise gofilecli.GoFileConnectionError("Connection refused")
+        return {contentId: {"status": "ok"} for contentId in contentsIds}
+
+
+class Cache:
+    def __init__(self):
+        self.invalidated = set()
+
+    def invalidate(self, *contentIds):
+        self.invalidated.update(contentIds)
+
+
+def test_bulk_delete_reports_connection_errors(monkeypatch):
+    cache = Cache()
+    api = FlakyApi()
+    monkeypatch.setattr(gofilecli, "get_api", lambda: api)
+    monkeypatch.setattr(gofilecli, "get_cache", lambda: cache)
+    targets = [{"id": f"id{index}", "name": f"f{index}", "path": f"f{index}", "parent": "folder"} for index in range(gofilecli.BULK_BATCH + 5)]
+
+    results = gofilecli.bulk("delete", targets, logging.getLogger(__name__), jobs=1)
+    assert len(results) == len(targets)
+    assert sum(status == "ok" for status in results.values()) == gofilecli.BULK_BATCH
+    assert results[targets[-1]["id"]] == "Connection refused"
+    assert cache.invalidated >= {"folder", *(target["id"] for target in targets[:gofilecli.BULK_BATCH])}
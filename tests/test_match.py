@@ -0,0 +1,30 @@
+"""
+The globs of --match (bulk operations), --include and .gofileignore.
+"""
+import pytest
+
+from gofilecli import match_path
+
+
+@pytest.mark.parametrize("path, pattern, matched", [
+    ("releases/v1.zip", "releases/*", True),
+    ("releases/v1/app.zip", "releases/*", False),
+    ("releases", "releases/*", False),
+    ("releases/v1.zip", "releases/v1.*", True),
+    ("other/releases/v1.zip", "releases/*", False),
+    # "**" at the start: any depth, none included
+    ("app.zip", "**/*.zip", True),
+    ("releases/v1/app.zip", "**/*.zip", True),
+    ("releases/v1/app.tar", "**/*.zip", False),
+    # In the middle
+    ("releases/app.zip", "releases/**/*.zip", True),
+    ("releases/v1/beta/app.zip", "releases/**/*.zip", True),
+    ("backup/releases/app.zip", "releases/**/*.zip", False),
+    # At the end: everything inside, not the folder itself
+    ("releases/v1", "releases/**", True),
+    ("releases/v1/app.zip", "releases/**", True),
+    ("releases", "releases/**", False),
+    ("releases-old/app.zip", "releases/**", False),
+])
+def test_match_path(path, pattern, matched):
+    assert match_path(path, pattern) is matched
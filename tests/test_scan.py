@@ -0,0 +1,51 @@
+"""
+What scan_files() picks up from a local folder: .gofileignore rules, --exclude
+and symlinked folders.
+"""
+import os
+
+import pytest
+
+from conftest import write_tree
+from gofilecli import IgnoreRules, scan_files
+
+
+def scanned(folder, **kwargs):
+    return sorted(os.path.relpath(path, folder).replace(os.sep, "/") for path in scan_files(str(folder), **kwargs))
+
+
+def test_ignore_rules():
+    rules = IgnoreRules().extend("", ["*.log", "!keep.log", "build/", "/dist", "docs/*.tmp"])
+    assert rules.ignored("debug.log", False)
+    assert rules.ignored("src/debug.log", False)
+    assert not rules.ignored("src/keep.log", False)
+    # "build/" matches folders only, at any depth
+    assert rules.ignored("src/build", True)
+    assert not rules.ignored("src/build", False)
+    # A leading "/" anchors to the folder of the rules
+    assert rules.ignored("dist", True)
+    assert not rules.ignored("src/dist", True)
+    # So does a "/" inside
+    assert rules.ignored("docs/a.tmp", False)
+    assert not rules.ignored("src/docs/a.tmp", False)
+
+
+def test_nested_ignore_files(tmp_path):
+    write_tree(tmp_path, {
+        ".gofileignore": b"*.log\n/build\n",
+        "app.py": b"", "debug.log": b"", "build/out.bin": b"",
+        "src/.gofileignore": b"!keep.log\ngenerated/\n",
+        "src/keep.log": b"", "src/other.log": b"", "src/build/out.bin": b"",
+        "src/generated/a.py": b"", "src/generated.py": b"",
+    })
+    assert scanned(tmp_path) == ["app.py", "src/build/out.bin", "src/generated.py", "src/keep.log"]
+    assert scanned(tmp_path, exclude=["src/build"]) == ["app.py", "src/generated.py", "src/keep.log"]
+
+
+def test_symlink_to_parent(tmp_path):
+    write_tree(tmp_path, {"a.txt": b"a", "sub/b.txt": b"b"})
+    try:
+        os.symlink(tmp_path, tmp_path / "sub" / "loop", target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("Symbolic links are not available")
+    assert scanned(tmp_path) == ["a.txt", "sub/b.txt"]
@@ -0,0 +1,147 @@
+"""
+End to end transfers of the command line against the mock GoFile server.
+"""
+import json
+import os
+import time
+
+from conftest import read_tree, write_tree
+
+FILES = {
+    "small.txt": b"hello gofile\n",
+    "medium.bin": os.urandom(300 * 1024),
+    "large.bin": os.urandom(3 * 1024 * 1024 + 17),
+}
+TREE = {
+    "a.txt": b"a" * 1000,
+    "docs/b.txt": os.urandom(5000),
+    "docs/deep/c.bin": os.urandom(70 * 1024),
+    "big.bin": os.urandom(2 * 1024 * 1024),
+}
+
+
+def test_upload_download_round_trip(cli, remote, tmp_path, name):
+    write_tree(tmp_path / "src", FILES)
+    cli("-f", str(tmp_path / "src"), "-n", name)
+    folder = remote.folder(name)
+    assert sorted(child["name"] for child in remote.children(folder["id"])) == sorted(FILES)
+
+    log = cli("-d", folder["code"], "-o", str(tmp_path / "out"), "-sg", "4")
+    assert "3/3 files downloaded" in log
+    assert read_tree(tmp_path / "out") == FILES
+    # A second run finds everything in place
+    assert "0/3 files downloaded, 3 skipped" in cli("-d", folder["code"], "-o", str(tmp_path / "out"))
+    assert "3 ok, 0 corrupted, 0 missing" in cli("--verify", folder["code"], "-o", str(tmp_path / "out"))
+
+
+def test_upload_sends_again_files_deleted_remotely(cli, remote, tmp_path, name):
+    write_tree(tmp_path / "src", FILES)
+    folder = remote.create_folder(name)
+    cli("-f", str(tmp_path / "src"), "-p", folder["id"])
+    deleted, = [child for child in remote.children(folder["id"]) if child["name"] == "medium.bin"]
+    remote.delete(deleted["id"])
+
+    # The hash index still knows medium.bin, the listing of the folder does not
+    log = cli("-f", str(tmp_path / "src"), "-p", folder["id"])
+    assert "2 already present" in log
+    assert sorted(child["name"] for child in remote.children(folder["id"])) == sorted(FILES)
+
+
+def test_download_resumes_partial_file(cli, remote, tmp_path, name):
+    write_tree(tmp_path / "src", {"large.bin": FILES["large.bin"]})
+    cli("-f", str(tmp_path / "src"), "-n", name)
+    folder = remote.folder(name)
+    file, = remote.children(folder["id"])
+    # What an interrupted download leaves: the first half on disk and the state saying so
+    size, half = len(FILES["large.bin"]), len(FILES["large.bin"]) // 2
+    (tmp_path / "out").mkdir()
+    with open(tmp_path / "out" / "large.bin.part", "wb") as f:
+        f.write(FILES["large.bin"][:half])
+        f.truncate(size)
+    with open(tmp_path / "out" / "large.bin.part.json", "w") as f:
+        json.dump({"url": file["link"], "size": size, "segments": [[0, size - 1, half]]}, f)
+
+    log = cli("-d", folder["code"], "-o", str(tmp_path / "out"))
+    assert "Resuming" in log
+    assert read_tree(tmp_path / "out") == {"large.bin": FILES["large.bin"]}
+
+
+def test_encrypt_decrypt(cli, remote, tmp_path, name):
+    write_tree(tmp_path / "src", FILES)
+    cli("-f", str(tmp_path / "src"), "-n", name, "-e")
+    folder = remote.folder(name)
+    children = remote.children(folder["id"])
+    assert sorted(child["name"] for child in children) == sorted(f"{file_name}.enc" for file_name in FILES)
+    for child in children:
+        assert remote.download(child) != FILES[child["name"][:-len(".enc")]]
+
+    cli("-d", folder["code"], "-o", str(tmp_path / "out"), "-de")
+    assert read_tree(tmp_path / "out") == FILES
+
+
+def test_bundle_unbundle(cli, remote, tmp_path, name):
+    write_tree(tmp_path / "src", TREE)
+    cli("-f", str(tmp_path / "src"), "-n", name, "-b", "--bundle-threshold", str(100 * 1024))
+    folder = remote.folder(name)
+    names = [child["name"] for child in remote.children(folder["id"])]
+    # The three small files travel in one tar, the big one as it is
+    assert "big.bin" in names
+    assert len([file_name for file_name in names if file_name.endswith(".tar")]) == 1
+
+    cli("-d", folder["code"], "-o", str(tmp_path / "out"), "-ub")
+    assert read_tree(tmp_path / "out") == TREE
+
+
+def test_sync(cli, remote, tmp_path, name):
+    source = tmp_path / "src"
+    write_tree(source, TREE)
+    folder = remote.create_folder(name)
+    assert "4 new or changed files, 0 unchanged" in cli("--sync", "-f", str(source), "-p", folder["id"])
+    assert "0 new or changed files, 4 unchanged" in cli("--sync", "-f", str(source), "-p", folder["id"])
+
+    changed = {**TREE, "docs/b.txt": os.urandom(5000), "new.txt": b"new"}
+    write_tree(source, changed)
+    assert "2 new or changed files, 3 unchanged" in cli("--sync", "-f", str(source), "-p", folder["id"])
+
+    out = str(tmp_path / "out")
+    assert "5 files downloaded, 0 unchanged" in cli("--sync", "-d", folder["code"], "-o", out)
+    assert read_tree(out) == changed
+    assert "0 files downloaded, 5 unchanged" in cli("--sync", "-d", folder["code"], "-o", out)
+
+
+def test_unlisted_folder(cli, remote, tmp_path, name):
+    source = tmp_path / "src"
+    write_tree(source, TREE)
+    folder = remote.create_folder(name)
+    cli("--sync", "-f", str(source), "-p", folder["id"])
+    docs = remote.folder("docs", folder["id"])
+    remote.unlist(docs["id"])
+    try:
+        log = cli("-d", folder["code"], "-o", str(tmp_path / "out"))
+        assert "1 folders could not be listed" in log
+        assert "1 folders could not be listed" in cli("--verify", folder["code"], "-o", str(tmp_path / "out"))
+        # A sync on part of the tree would upload the files of docs again
+        cli("--sync", "-f", str(source), "-p", folder["id"], returncode=1)
+    finally:
+        remote.unlist(docs["id"], False)
+    assert len(remote.children(folder["id"])) == 3
+    assert len(remote.children(docs["id"])) == 2
+
+
+def test_enqueued_sync(cli, remote, tmp_path, name):
+    source = tmp_path / "src"
+    write_tree(source, TREE)
+    folder = remote.create_folder(name)
+    assert "queued: sync upload" in cli("--sync", "-f", str(source), "-p", folder["id"], "-q")
+    daemon = cli.start("--daemon")
+    try:
+        deadline = time.time() + 60
+        while "done" not in cli("--queue"):
+            assert time.time() < deadline and daemon.poll() is None
+            time.sleep(0.2)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+    # The tree is kept as it is, not flattened into the folder
+    assert sorted(child["name"] for child in remote.children(folder["id"])) == ["a.txt", "big.bin", "docs"]
+    assert "0 new or changed files, 4 unchanged" in cli("--sync", "-f", str(source), "-p", folder["id"])